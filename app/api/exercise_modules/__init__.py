@@ -0,0 +1,12 @@
+from app.api.exercise_modules.registry import (
+    Exercise,
+    EXERCISES,
+    GESTURES,
+    DEFAULT_EXERCISE,
+    REST,
+    register,
+    get_exercise,
+)
+
+# importing a module registers its exercise; add new ones here
+from app.api.exercise_modules import squat, pushup, rest  # noqa: E402,F401
@@ -1,5 +1,37 @@
 import numpy as np
-from collections import deque
+
+from app.api.utils.landmarks import (
+    normalize_landmarks_batch,
+    angle_between_batch,
+    rolling_mean,
+    ema_scan,
+    first_codes,
+)
+from app.api.utils.gestures import PLANK
+from app.api.exercise_modules.registry import Exercise, register
+
+_BATCH_IDXS = [11, 12, 13, 14, 15, 16, 23, 24, 27, 28]
+
+PUSHUP_CUES = (
+    "GET_ON_FLOOR",
+    "HOLD_PLANK",
+    "HANDS_CLOSER",
+    "HANDS_WIDER",
+    "HANDS_UNDER_SHOULDERS",
+    "LIFT_HIPS",
+    "LOWER_HIPS",
+    "GO_LOWER",
+)
+
+PUSHUP_FEATURES = {
+    "torso_dy":     4,
+    "hand_ratio":   4,
+    "hand_xoffset": 4,
+    "hip_dev_abs":  4,
+    "hip_dev_sign": 4,
+    "elbow_mean_hist": 12,
+    "bottom_ok":       8,
+}
 
 def get_pushup_config(angle_between, ema_update):
     thresholds = {
@@ -16,17 +48,6 @@ def get_pushup_config(angle_between, ema_update):
         "ema_update":    ema_update,
     }
 
-    deques = {
-        "upright":      deque(maxlen=4),
-        "plank":        deque(maxlen=4),
-        "hand_ratio":   deque(maxlen=4),
-        "hand_xoffset": deque(maxlen=4),
-        "hip_dev_abs":  deque(maxlen=4),
-        "hip_dev_sign": deque(maxlen=4),
-        "elbow_mean_hist": deque(maxlen=12),
-        "bottom_ok":       deque(maxlen=8),
-    }
-
     smoothed = {
         "upright_score": None,
         "plank_score":   None,
@@ -37,7 +58,7 @@ def get_pushup_config(angle_between, ema_update):
         "elbow_mean":    None,
         "top_max":       None,
     }
-    return thresholds, deques, smoothed
+    return thresholds, smoothed
 
 
 def _signed_y_distance_to_line(pt, a, b):
@@ -51,7 +72,7 @@ def _signed_y_distance_to_line(pt, a, b):
     return signed_y, dist
 
 
-def analyze_pushup(norm, smoothed, deques, thresholds):
+def analyze_pushup(norm, smoothed, history, thresholds, raw_landmarks=None):
     ab  = thresholds["angle_between"]
     ema = thresholds["ema_update"]
     mistakes = []
@@ -70,11 +91,8 @@ def analyze_pushup(norm, smoothed, deques, thresholds):
     wrist_span    = abs(R_WR[0] - L_WR[0])
 
     delta_y = abs(sh_center[1] - hip_center[1])
-    deques["upright"].append(delta_y)
-    deques["plank"].append(delta_y)
-
-    upright_score = np.mean(deques["upright"]) if deques["upright"] else delta_y
-    plank_score   = np.mean(deques["plank"])   if deques["plank"]   else delta_y
+    # the upright and plank scores were always fed the same values, so they share one window
+    upright_score = plank_score = history.append("torso_dy", delta_y)
 
     smoothed["upright_score"] = ema(smoothed["upright_score"], upright_score)
     smoothed["plank_score"]   = ema(smoothed["plank_score"],   plank_score)
@@ -85,45 +103,41 @@ def analyze_pushup(norm, smoothed, deques, thresholds):
                 smoothed["plank_score"] < thresholds["PLANK_TORSO_Y_MAX"])
 
     if clearly_upright:
-        mistakes.append("Get on the floor.")
+        mistakes.append("GET_ON_FLOOR")
         return mistakes[:2], smoothed
     if not in_plank:
-        mistakes.append("Hold a straight plank.")
+        mistakes.append("HOLD_PLANK")
 
     hands_ratio  = wrist_span / shoulder_span
     x_offset_avg = 0.5 * (abs(L_WR[0] - L_SH[0]) + abs(R_WR[0] - R_SH[0]))
-    deques["hand_ratio"].append(hands_ratio)
-    deques["hand_xoffset"].append(x_offset_avg)
+    history.append("hand_xoffset", x_offset_avg)
 
-    smoothed["hands_ratio"]   = round(np.mean(deques["hand_ratio"]), 2) if deques["hand_ratio"] else hands_ratio
+    smoothed["hands_ratio"]   = round(history.append("hand_ratio", hands_ratio), 2)
     smoothed["hands_xoffset"] = ema(smoothed["hands_xoffset"], x_offset_avg)
 
     if smoothed["hands_ratio"] is not None:
         if smoothed["hands_ratio"] > thresholds["HANDS_SHOULDER_RATIO_MAX"]:
-            mistakes.append("Bring hands closer.")
+            mistakes.append("HANDS_CLOSER")
         elif smoothed["hands_ratio"] < thresholds["HANDS_SHOULDER_RATIO_MIN"]:
-            mistakes.append("Move hands wider.")
+            mistakes.append("HANDS_WIDER")
     if smoothed["hands_xoffset"] is not None and smoothed["hands_xoffset"] > thresholds["HANDS_X_OFFSET_MAX"]:
         if len(mistakes) < 2:
-            mistakes.append("Hands under shoulders.")
+            mistakes.append("HANDS_UNDER_SHOULDERS")
     if len(mistakes) >= 2:
         return mistakes[:2], smoothed
 
     signed_y, dev_abs = _signed_y_distance_to_line(hip_center, sh_center, ank_center)
-    deques["hip_dev_abs"].append(dev_abs)
-    deques["hip_dev_sign"].append(signed_y)
-
-    hip_dev_abs  = np.mean(deques["hip_dev_abs"])  if deques["hip_dev_abs"]  else dev_abs
-    hip_dev_sign = np.mean(deques["hip_dev_sign"]) if deques["hip_dev_sign"] else signed_y
+    hip_dev_abs  = history.append("hip_dev_abs", dev_abs)
+    hip_dev_sign = history.append("hip_dev_sign", signed_y)
 
     smoothed["hip_dev"]     = ema(smoothed["hip_dev"], hip_dev_abs)
     smoothed["hip_dev_dir"] = ema(smoothed["hip_dev_dir"], hip_dev_sign)
 
     if smoothed["hip_dev"] is not None and smoothed["hip_dev"] > thresholds["HIP_LINE_MAX_DEV"]:
         if smoothed["hip_dev_dir"] is not None and smoothed["hip_dev_dir"] > 0:
-            mistakes.append("Lift hips.")
+            mistakes.append("LIFT_HIPS")
         else:
-            mistakes.append("Lower hips.")
+            mistakes.append("LOWER_HIPS")
     if len(mistakes) >= 2:
         return mistakes[:2], smoothed
 
@@ -134,13 +148,10 @@ def analyze_pushup(norm, smoothed, deques, thresholds):
     elbow_mean_now = 0.5 * (angle_left_2d + angle_right_2d)
 
     smoothed["elbow_mean"] = ema(smoothed["elbow_mean"], elbow_mean_now)
-    deques["elbow_mean_hist"].append(elbow_mean_now)
+    history.append("elbow_mean_hist", elbow_mean_now)
 
-    if len(deques["elbow_mean_hist"]):
-        top_max = max(deques["elbow_mean_hist"])
-        smoothed["top_max"] = top_max if smoothed.get("top_max") is None else max(smoothed["top_max"], top_max)
-    else:
-        top_max = smoothed.get("top_max", elbow_mean_now)
+    top_max = history.max("elbow_mean_hist")
+    smoothed["top_max"] = top_max if smoothed.get("top_max") is None else max(smoothed["top_max"], top_max)
 
     abs_pass = (smoothed["elbow_mean"] is not None and
                 smoothed["elbow_mean"] <= thresholds["ELBOW_ABS_REQUIRED"])
@@ -149,10 +160,102 @@ def analyze_pushup(norm, smoothed, deques, thresholds):
         rel_pass = (smoothed["elbow_mean"] <= (smoothed["top_max"] - thresholds["ELBOW_REL_DROP_DEG"]))
 
     bottom_ok_now = 1 if (abs_pass or rel_pass) else 0
-    deques["bottom_ok"].append(bottom_ok_now)
-    bottom_ok_ratio = np.mean(deques["bottom_ok"]) if deques["bottom_ok"] else 0.0
+    bottom_ok_ratio = history.append("bottom_ok", bottom_ok_now)
 
     if bottom_ok_ratio < thresholds["BOTTOM_OK_RATIO"]:
-        mistakes.insert(0, "Go lower.")
+        mistakes.insert(0, "GO_LOWER")
 
     return mistakes[:2], smoothed
+
+
+def _signed_y_distance_to_line_batch(pt, a, b):
+    pa = pt[:, :2] - a[:, :2]
+    v  = b[:, :2]  - a[:, :2]
+    vv = np.sum(v * v, axis=1) + 1e-9
+    t  = np.sum(pa * v, axis=1) / vv
+    proj = a[:, :2] + t[:, None] * v
+    signed_y = pt[:, 1] - proj[:, 1]
+    dist = np.linalg.norm(pt[:, :2] - proj, axis=1)
+    return signed_y, dist
+
+
+def analyze_pushup_batch(raw_landmarks, thresholds):
+    norm = normalize_landmarks_batch(np.asarray(raw_landmarks, dtype=np.float32), _BATCH_IDXS)
+    n = len(norm)
+    codes = np.full((n, 2), -1, dtype=np.int8)
+    if not n:
+        return codes
+
+    L_SH, R_SH, L_ELB, R_ELB, L_WR, R_WR, L_HIP, R_HIP, L_ANK, R_ANK = np.moveaxis(norm, 1, 0)
+    sh_center  = (L_SH + R_SH) / 2.0
+    hip_center = (L_HIP + R_HIP) / 2.0
+    ank_center = (L_ANK + R_ANK) / 2.0
+
+    # stage 1: every frame feeds the upright/plank windows
+    torso_score = ema_scan(rolling_mean(np.abs(sh_center[:, 1] - hip_center[:, 1]), 4))
+    upright = torso_score > thresholds["UPRIGHT_DELTA_Y_MIN"]
+    codes[upright, 0] = 0
+
+    # stage 2: hand placement, only for frames that are not clearly upright
+    s2 = np.flatnonzero(~upright)
+    not_plank = torso_score[s2] >= thresholds["PLANK_TORSO_Y_MAX"]
+    shoulder_span = np.linalg.norm((R_SH[s2] - L_SH[s2])[:, :2], axis=1) + 1e-9
+    wrist_span = np.abs(R_WR[s2, 0] - L_WR[s2, 0])
+    hands_ratio = np.round(rolling_mean(wrist_span / shoulder_span, 4), 2)
+    x_offset = 0.5 * (np.abs(L_WR[s2, 0] - L_SH[s2, 0]) + np.abs(R_WR[s2, 0] - R_SH[s2, 0]))
+    hands_xoffset = ema_scan(x_offset)
+    closer = hands_ratio > thresholds["HANDS_SHOULDER_RATIO_MAX"]
+    wider = ~closer & (hands_ratio < thresholds["HANDS_SHOULDER_RATIO_MIN"])
+    count = not_plank.astype(np.int8) + closer + wider
+    under = (hands_xoffset > thresholds["HANDS_X_OFFSET_MAX"]) & (count < 2)
+    count += under
+    stage2 = np.stack([
+        np.where(not_plank, 1, -1),
+        np.where(closer, 2, -1),
+        np.where(wider, 3, -1),
+        np.where(under, 4, -1),
+    ], axis=1)
+
+    # stage 3: hip line, only for frames with fewer than two cues so far
+    k3 = np.flatnonzero(count < 2)
+    s3 = s2[k3]
+    signed_y, dev_abs = _signed_y_distance_to_line_batch(hip_center[s3], sh_center[s3], ank_center[s3])
+    hip_dev = ema_scan(rolling_mean(dev_abs, 4))
+    hip_dev_dir = ema_scan(rolling_mean(signed_y, 4))
+    hip_bad = hip_dev > thresholds["HIP_LINE_MAX_DEV"]
+    lift = hip_bad & (hip_dev_dir > 0)
+    lower = hip_bad & ~lift
+    count3 = count[k3] + hip_bad
+
+    # stage 4: elbow depth, only for frames still under two cues
+    k4 = np.flatnonzero(count3 < 2)
+    s4 = s3[k4]
+    angle_left_2d  = angle_between_batch((L_SH[s4] - L_ELB[s4])[:, :2], (L_WR[s4] - L_ELB[s4])[:, :2])
+    angle_right_2d = angle_between_batch((R_SH[s4] - R_ELB[s4])[:, :2], (R_WR[s4] - R_ELB[s4])[:, :2])
+    elbow_mean_now = 0.5 * (angle_left_2d + angle_right_2d)
+    elbow_mean = ema_scan(elbow_mean_now)
+    top_max = np.maximum.accumulate(elbow_mean_now)
+    bottom_ok = ((elbow_mean <= thresholds["ELBOW_ABS_REQUIRED"]) |
+                 (elbow_mean <= top_max - thresholds["ELBOW_REL_DROP_DEG"]))
+    go_lower = rolling_mean(bottom_ok, 8) < thresholds["BOTTOM_OK_RATIO"]
+
+    go_lower_col = np.full(len(s2), -1, dtype=np.int64)
+    hip_col = np.full(len(s2), -1, dtype=np.int64)
+    hip_col[k3] = np.where(lift, 5, np.where(lower, 6, -1))
+    go_lower_col[k3[k4]] = np.where(go_lower, 7, -1)
+    candidates = np.concatenate([go_lower_col[:, None], stage2, hip_col[:, None]], axis=1)
+    codes[s2] = first_codes(candidates)
+    return codes
+
+
+register(Exercise(
+    name="pushup",
+    config=get_pushup_config,
+    analyze=analyze_pushup,
+    landmarks=tuple(_BATCH_IDXS),
+    features=PUSHUP_FEATURES,
+    cues=PUSHUP_CUES,
+    batch=analyze_pushup_batch,
+    gesture=PLANK,
+    label="PUSH-UP",
+))
@@ -0,0 +1,46 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+DEFAULT_EXERCISE = "squat"
+# the engine's between-sets state; registered like an exercise but never counts reps
+REST = "rest"
+
+
+@dataclass(frozen=True)
+class Exercise:
+    name: str
+    # (angle_between, ema_update) -> (thresholds, smoothed)
+    config: Callable
+    # (norm, smoothed, history, thresholds, raw_landmarks) -> (mistakes, smoothed)
+    analyze: Callable
+    # pose indices the analyzer reads; the batch path normalises only these
+    landmarks: tuple[int, ...] = ()
+    # per-frame features kept in SessionHistory, {name: rolling window in frames}
+    features: dict[str, int] = field(default_factory=dict)
+    cues: tuple[str, ...] = ()
+    # (raw_landmarks (N, 33, 4), thresholds) -> (N, 2) indices into `cues`, -1 for none
+    batch: Callable | None = None
+    # a GestureSwitch gesture (app/api/utils/gestures.py) that starts this exercise from rest
+    gesture: str | None = None
+    # shown on the overlay; defaults to the upper-cased name
+    label: str | None = None
+
+
+EXERCISES: dict[str, Exercise] = {}
+# {gesture: exercise name}
+GESTURES: dict[str, str] = {}
+
+
+def register(exercise: Exercise) -> Exercise:
+    if exercise.name in EXERCISES:
+        raise ValueError(f"Exercise '{exercise.name}' is already registered")
+    if exercise.gesture in GESTURES:
+        raise ValueError(f"Gesture '{exercise.gesture}' already starts '{GESTURES[exercise.gesture]}'")
+    EXERCISES[exercise.name] = exercise
+    if exercise.gesture is not None:
+        GESTURES[exercise.gesture] = exercise.name
+    return exercise
+
+
+def get_exercise(name: str) -> Exercise | None:
+    return EXERCISES.get(name)
@@ -1,14 +1,18 @@
 from typing import Tuple, Dict, Any
 
-def get_rest_config(angle_between, ema_update) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+from app.api.exercise_modules.registry import Exercise, register, REST
+
+def get_rest_config(angle_between, ema_update) -> Tuple[Dict[str, Any], Dict[str, Any]]:
 
     thresholds = {}
-    deques = {}
     smoothed = {}
-    return thresholds, deques, smoothed
+    return thresholds, smoothed
 
-def analyze_rest(norm, smoothed, deques, thresholds, *args, **kwargs):
+def analyze_rest(norm, smoothed, history, thresholds, raw_landmarks=None):
 
     mistakes = []
     updated_smoothed = smoothed
     return mistakes, updated_smoothed
+
+
+register(Exercise(name=REST, config=get_rest_config, analyze=analyze_rest))
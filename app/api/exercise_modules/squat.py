@@ -1,8 +1,33 @@
 # exercise_modules/squat.py
 import numpy as np
-from collections import deque
+
+from app.api.utils.landmarks import (
+    normalize_landmarks_batch,
+    angle_between_batch,
+    rolling_mean,
+    ema_scan,
+    first_codes,
+)
+from app.api.utils.gestures import ONE_HAND_UP
+from app.api.exercise_modules.registry import Exercise, register
 
 _REQUIRED_LEG_IDXS = [25, 26, 27, 28]
+_BATCH_IDXS = [11, 12, 23, 24, 25, 26, 27, 28]
+
+SQUAT_CUES = (
+    "STEP_BACK",
+    "SQUAT_GO_DEEPER",
+    "SQUAT_CHEST_UP",
+    "SQUAT_KNEE_OUT_LEFT",
+    "SQUAT_KNEE_OUT_RIGHT",
+)
+
+SQUAT_FEATURES = {
+    "torso":     5,
+    "depth":     5,
+    "valgus_L":  5,
+    "valgus_R":  5,
+}
 
 def get_squat_config(angle_between, ema_update):
     thresholds = {
@@ -16,12 +41,6 @@ def get_squat_config(angle_between, ema_update):
         "angle_between": angle_between,
         "ema_update":    ema_update,
     }
-    deques = {
-        "torso":     deque(maxlen=5),
-        "depth":     deque(maxlen=5),
-        "valgus_L":  deque(maxlen=5),
-        "valgus_R":  deque(maxlen=5),
-    }
     smoothed = {
         "torso_lean_deg":  None,
         "depth_flag":      None,
@@ -30,7 +49,7 @@ def get_squat_config(angle_between, ema_update):
         "knee_flex_left":  None,
         "knee_flex_right": None,
     }
-    return thresholds, deques, smoothed
+    return thresholds, smoothed
 
 
 def _in_frame_xy(x, y, margin):
@@ -47,12 +66,12 @@ def _legs_visible(raw_landmarks, vis_thr, margin):
     return ok >= 2
 
 
-def analyze_squat(norm, smoothed, deques, thresholds, raw_landmarks):
+def analyze_squat(norm, smoothed, history, thresholds, raw_landmarks):
 
     mistakes = []
 
     if not _legs_visible(raw_landmarks, thresholds["VIS_THR"], thresholds["INFRAME_MARGIN"]):
-        mistakes.append("Step back; show knees/ankles.")
+        mistakes.append("STEP_BACK")
         return mistakes, smoothed
 
     L_SH, R_SH = norm[11], norm[12]
@@ -66,29 +85,81 @@ def analyze_squat(norm, smoothed, deques, thresholds, raw_landmarks):
 
     v_torso = sh_center[:2] - hip_center[:2]
     torso_lean_deg = thresholds["angle_between"](v_torso, np.array([0.0, -1.0]))
-    deques["torso"].append(torso_lean_deg)
+    history.append("torso", torso_lean_deg)
     smoothed["torso_lean_deg"] = thresholds["ema_update"](smoothed["torso_lean_deg"], torso_lean_deg)
 
     depth_ok = 1 if (hip_center[1] > (knee_center[1] - thresholds["DEPTH_TOLERANCE"])) else 0
-    deques["depth"].append(depth_ok)
-    smoothed["depth_flag"] = round(np.mean(deques["depth"]), 2) if deques["depth"] else None
+    smoothed["depth_flag"] = round(history.append("depth", depth_ok), 2)
 
     dx_L = L_KNEE[0] - L_ANK[0]
     dx_R = R_KNEE[0] - R_ANK[0]
     valgus_left  = 1 if abs(dx_L) > thresholds["KNEE_CAVE_X_OFFSET"] and dx_L < 0 else 0
     valgus_right = 1 if abs(dx_R) > thresholds["KNEE_CAVE_X_OFFSET"] and dx_R > 0 else 0
-    deques["valgus_L"].append(valgus_left)
-    deques["valgus_R"].append(valgus_right)
-    smoothed["valgus_left"]  = round(np.mean(deques["valgus_L"]), 2) if deques["valgus_L"] else None
-    smoothed["valgus_right"] = round(np.mean(deques["valgus_R"]), 2) if deques["valgus_R"] else None
+    smoothed["valgus_left"]  = round(history.append("valgus_L", valgus_left), 2)
+    smoothed["valgus_right"] = round(history.append("valgus_R", valgus_right), 2)
 
     if smoothed["depth_flag"] is not None and smoothed["depth_flag"] < thresholds["DEPTH_RATIO_TRIGGER"]:
-        mistakes.append("Go deeper.")
+        mistakes.append("SQUAT_GO_DEEPER")
     if smoothed["torso_lean_deg"] is not None and smoothed["torso_lean_deg"] > thresholds["TORSO_LEAN_LIMIT_DEG"]:
-        mistakes.append("Chest up.")
+        mistakes.append("SQUAT_CHEST_UP")
     if smoothed["valgus_left"] is not None and smoothed["valgus_left"] > thresholds["VALGUS_TRIGGER"]:
-        mistakes.append("Push left knee out.")
+        mistakes.append("SQUAT_KNEE_OUT_LEFT")
     if smoothed["valgus_right"] is not None and smoothed["valgus_right"] > thresholds["VALGUS_TRIGGER"]:
-        mistakes.append("Push right knee out.")
+        mistakes.append("SQUAT_KNEE_OUT_RIGHT")
 
     return mistakes[:2], smoothed
+
+
+def analyze_squat_batch(raw_landmarks, thresholds):
+    raw_landmarks = np.asarray(raw_landmarks, dtype=np.float32)
+    n = len(raw_landmarks)
+    codes = np.full((n, 2), -1, dtype=np.int8)
+
+    legs = raw_landmarks[:, _REQUIRED_LEG_IDXS]
+    margin = thresholds["INFRAME_MARGIN"]
+    in_frame = ((legs[..., 0] >= -margin) & (legs[..., 0] <= 1.0 + margin) &
+                (legs[..., 1] >= -margin) & (legs[..., 1] <= 1.0 + margin))
+    visible = ((legs[..., 3] >= thresholds["VIS_THR"]) & in_frame).sum(axis=1) >= 2
+    codes[~visible, 0] = 0
+
+    norm = normalize_landmarks_batch(raw_landmarks[visible], _BATCH_IDXS)
+    if not len(norm):
+        return codes
+    L_SH, R_SH, L_HIP, R_HIP, L_KNEE, R_KNEE, L_ANK, R_ANK = np.moveaxis(norm, 1, 0)
+    hip_center  = (L_HIP + R_HIP) / 2.0
+    sh_center   = (L_SH + R_SH) / 2.0
+    knee_center = (L_KNEE + R_KNEE) / 2.0
+
+    v_torso = sh_center[:, :2] - hip_center[:, :2]
+    torso_lean = ema_scan(angle_between_batch(v_torso, np.array([0.0, -1.0])))
+
+    depth_ok = hip_center[:, 1] > (knee_center[:, 1] - thresholds["DEPTH_TOLERANCE"])
+    depth_flag = np.round(rolling_mean(depth_ok, 5), 2)
+
+    dx_L = L_KNEE[:, 0] - L_ANK[:, 0]
+    dx_R = R_KNEE[:, 0] - R_ANK[:, 0]
+    valgus_left  = (np.abs(dx_L) > thresholds["KNEE_CAVE_X_OFFSET"]) & (dx_L < 0)
+    valgus_right = (np.abs(dx_R) > thresholds["KNEE_CAVE_X_OFFSET"]) & (dx_R > 0)
+    valgus_left  = np.round(rolling_mean(valgus_left, 5), 2)
+    valgus_right = np.round(rolling_mean(valgus_right, 5), 2)
+
+    candidates = np.stack([
+        np.where(depth_flag < thresholds["DEPTH_RATIO_TRIGGER"], 1, -1),
+        np.where(torso_lean > thresholds["TORSO_LEAN_LIMIT_DEG"], 2, -1),
+        np.where(valgus_left > thresholds["VALGUS_TRIGGER"], 3, -1),
+        np.where(valgus_right > thresholds["VALGUS_TRIGGER"], 4, -1),
+    ], axis=1)
+    codes[visible] = first_codes(candidates)
+    return codes
+
+
+register(Exercise(
+    name="squat",
+    config=get_squat_config,
+    analyze=analyze_squat,
+    landmarks=tuple(_BATCH_IDXS),
+    features=SQUAT_FEATURES,
+    cues=SQUAT_CUES,
+    batch=analyze_squat_batch,
+    gesture=ONE_HAND_UP,
+))
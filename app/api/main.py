@@ -1,8 +1,12 @@
 
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Query
 from app.api.routes import auth
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
@@ -10,13 +14,62 @@ from app.api.routes.voice import router as coach_tts_router
 from app.api.routes.ai_feedback import router as ai_feedback_router
 
 from app.api.routes.workout import router as workouts_router
+from app.api.routes.landmarks import router as landmarks_router
+from app.api.routes.analysis import router as analysis_router, start_pool, stop_pool
+from app.api.routes.events import router as events_router
 
 from app.api.utils.engine import (
     set_config_handler,
     generate_frames,
+    generate_overlay_events,
 )
+from app.api.utils.session import PoseSession, current_session, active_sessions, drop_idle_sessions, DEFAULT_SESSION_ID
+from app.api.utils.stream import MJPEGEncoder
+from app.api.utils import metrics
+from app.api.utils.jobs import FEEDBACK_JOBS
+from app.api.utils.cue_audio import CUE_AUDIO
+from app.api.utils.db import ensure_indexes
+from app.api.utils.workout_store import WORKOUT_WRITER, WorkoutBufferFull
+from app.api.utils.log import log_event
 
-app = FastAPI()
+SESSION_SWEEP_SECONDS = 60
+
+
+async def _evict_idle_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        for session in drop_idle_sessions():
+            if not session.workouts_buffer or session.session_id == DEFAULT_SESSION_ID:
+                continue
+            # sets the user never flushed would otherwise be lost with the session
+            for w in session.workouts_buffer:
+                w.setdefault("created_at", time.time())
+                w.setdefault("persona", session.persona)
+            try:
+                WORKOUT_WRITER.add(session.session_id, session.workouts_buffer)
+            except WorkoutBufferFull:
+                log_event("evicted_workouts_lost", logging.WARNING, session=session.session_id,
+                          workouts=len(session.workouts_buffer))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    FEEDBACK_JOBS.bind(asyncio.get_running_loop())
+    CUE_AUDIO.load()
+    start_pool()
+    # in the background: a slow or unreachable database must not hold up startup
+    indexes = asyncio.create_task(ensure_indexes())
+    sweeper = asyncio.create_task(_evict_idle_sessions())
+    yield
+    indexes.cancel()
+    sweeper.cancel()
+    await WORKOUT_WRITER.close()
+    stop_pool()
+    for session in active_sessions():
+        session.stop_recording()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(auth.router)
 app.add_middleware(
@@ -33,15 +86,47 @@ app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
 @app.get("/set_config")
-def set_config(exercise: str):
-    return set_config_handler(exercise)
+def set_config(exercise: str, session: PoseSession = Depends(current_session)):
+    return set_config_handler(session, exercise)
 
 
 @app.get("/video")
-def video_feed():
-    return StreamingResponse(generate_frames(),
+def video_feed(
+    width: int | None = Query(None, ge=160, le=1920),
+    quality: int = Query(80, ge=10, le=100),
+    fps: float | None = Query(None, gt=0, le=60),
+    adaptive: bool = Query(False),
+    session: PoseSession = Depends(current_session),
+):
+    encoder = MJPEGEncoder(width=width, quality=quality, max_fps=fps, adaptive=adaptive)
+    return StreamingResponse(generate_frames(session, encoder),
                              media_type="multipart/x-mixed-replace; boundary=frame")
 
+
+@app.get("/video/overlay")
+def video_overlay(session: PoseSession = Depends(current_session)):
+    return StreamingResponse(generate_overlay_events(session),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/video/stats")
+def video_stats(session: PoseSession = Depends(current_session)):
+    pipeline, encoder = session.pipeline, session.encoder
+    if pipeline is None:
+        return {"status": "idle"}
+    stats = {"status": "ok", **pipeline.stats()}
+    if encoder is not None:
+        stats["encoder"] = encoder.stats()
+    return stats
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 app.include_router(workouts_router)
 app.include_router(coach_tts_router)
-app.include_router(ai_feedback_router)
\ No newline at end of file
+app.include_router(ai_feedback_router)
+app.include_router(landmarks_router)
+app.include_router(analysis_router)
+app.include_router(events_router)
\ No newline at end of file
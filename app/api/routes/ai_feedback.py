@@ -1,36 +1,65 @@
 import os
-import uuid
-import shutil
-import subprocess
+import re
+import json
+import time
+import asyncio
+import logging
+from collections import Counter
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from app.api.utils import state
+from app.api.utils.session import PoseSession, current_session, find_session
+from app.api.utils.jobs import FEEDBACK_JOBS, job_view
+from app.api.utils.tts import PIPER_POOL, TTSCache
+from app.api.utils.personas import PERSONAS, DEFAULT_PERSONA
+from app.api.utils.llm_cache import LLMCache
+from app.api.utils.metrics import STAGE_SECONDS, LLM_CALLS
+from app.api.utils.log import log_event
 from app.api.prompts import cute, harsh
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
-client = OpenAI(
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+client = AsyncOpenAI(
     api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"
+    base_url=OPENROUTER_BASE_URL
 )
 MODEL = "meta-llama/llama-3-8b-instruct"
+FALLBACK_TEXT = "Keep your form tight and steady Queen! You got this."
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# sets with the same exercise, persona, mistakes and similar reps/duration share completions
+REP_BUCKET = 5
+DURATION_BUCKET = 30
+llm_cache = LLMCache(
+    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", 6 * 3600)),
+    variants=int(os.getenv("LLM_CACHE_VARIANTS", 3)),
+)
 
 APP_DIR = Path(__file__).resolve().parents[2]
-REPO_ROOT = APP_DIR.parent
-VOICE_DIR = (REPO_ROOT / "scripts" / "piper-voices").resolve()
 STATIC_TMP = (APP_DIR / "static" / "tmp").resolve()
 STATIC_TMP.mkdir(parents=True, exist_ok=True)
 
-PERSONA_TO_MODEL = {
-    "default": VOICE_DIR / "en_US-libritts-high.onnx",
-    "goggins": VOICE_DIR / "en_US-joe-medium.onnx",
-    "barbie": VOICE_DIR / "en_US-amy-medium.onnx",
-}
+# piper is CPU bound; cap concurrent syntheses so feedback bursts can't starve the frame threads
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", 2))
+tts_executor = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="piper")
+FEEDBACK_WAIT_SECONDS = 30.0
+
+tts_cache = TTSCache(
+    STATIC_TMP, PIPER_POOL,
+    max_bytes=int(float(os.getenv("TTS_CACHE_MAX_MB", 200)) * 1024 * 1024),
+    max_age=float(os.getenv("TTS_CACHE_MAX_AGE_HOURS", 24 * 7)) * 3600,
+)
+
+PERSONA_TO_MODEL = {persona: spec["model"] for persona, spec in PERSONAS.items()}
 
 class FeedbackIn(BaseModel):
     exercise: Optional[str] = None
@@ -39,10 +68,10 @@ class FeedbackIn(BaseModel):
     mistakes: Optional[List[str]] = None
     persona: Optional[str] = None
 
-def _default_payload_from_state() -> Optional[dict]:
-    if state.LAST_SET_SUMMARY:
-        base = dict(state.LAST_SET_SUMMARY)
-        base.setdefault("persona", getattr(state, "PERSONA", "default"))
+def _default_payload_from_session(session: PoseSession) -> Optional[dict]:
+    if session.last_set_summary:
+        base = dict(session.last_set_summary)
+        base.setdefault("persona", session.persona)
         return base
     return None
 
@@ -52,97 +81,259 @@ def _fmt_duration(seconds: Optional[float]) -> str:
     m, s = divmod(int(seconds), 60)
     return f"{m}m {s}s" if m else f"{s}s"
 
+def _mistake_summary(mistakes: List[str]) -> List[str]:
+    # set summaries carry one entry per bad frame; keep each cue once, most frequent first
+    return [m for m, _ in Counter(mistakes).most_common()]
+
+def _cache_key(payload: dict, persona: str) -> tuple:
+    return (
+        payload.get("exercise") or "exercise",
+        persona,
+        int(payload.get("reps") or 0) // REP_BUCKET,
+        int(payload.get("duration") or 0) // DURATION_BUCKET,
+        frozenset(payload.get("mistakes") or []),
+    )
+
+def _bucketed(payload: dict) -> dict:
+    # cached completions are shared across the bucket, so the prompt only states the
+    # bucket and says so; the coach must not quote one user's numbers to another
+    reps = int(payload.get("reps") or 0)
+    lo = reps // REP_BUCKET * REP_BUCKET
+    duration = int(payload.get("duration") or 0) // DURATION_BUCKET * DURATION_BUCKET
+    return {
+        **payload,
+        "reps": f"{max(lo, 1)}-{lo + REP_BUCKET - 1}" if reps else "unknown",
+        "duration": (f"{_fmt_duration(max(duration, 1))}-{_fmt_duration(duration + DURATION_BUCKET - 1)}"
+                     if payload.get("duration") else "unknown"),
+    }
+
 def _build_prompt(payload: dict) -> str:
     exercise = payload.get("exercise", "exercise")
-    reps = payload.get("reps", 0)
-    duration = _fmt_duration(payload.get("duration"))
-    mistakes = payload.get("mistakes", []) or []
+    mistakes = _mistake_summary(payload.get("mistakes", []) or [])
 
     return (
         f"Exercise: {exercise}\n"
-        f"Reps: {reps}\n"
-        f"Duration: {duration}\n"
-        f"Frequent issues: {', '.join(mistakes) if mistakes else 'none'}"
+        f"Reps (range): {payload.get('reps', 'unknown')}\n"
+        f"Duration (range): {payload.get('duration', 'unknown')}\n"
+        f"Frequent issues: {', '.join(mistakes) if mistakes else 'none'}\n"
+        "Reps and duration are ranges, not exact values: never state a specific rep count "
+        "or time for this set."
     )
 
-def _call_openrouter(prompt: str, persona: str) -> str:
+def _messages(prompt: str, persona: str) -> list:
     style = {
         "default": "Neutral, supportive.",
         "goggins": harsh.PROMPT,
         "barbie": cute.PROMPT,
-    }.get(persona, "Neutral, supportive.")
+    }.get(persona) or PERSONAS.get(persona, {}).get("style") or "Neutral, supportive."
+    return [
+        {
+            "role": "system",
+            "content": (
+                "You are a concise fitness coach. "
+                "Return 1–3 short sentences: "
+                "1) praise/motivation, "
+                "2) one actionable cue, "
+                "3) a target for next set. "
+                "Avoid emojis. Keep under 40 words. Don't start with 'here are three sentences' or anything. Provide directly with the sentences. "
+                f"Style: {style}"
+            ),
+        },
+        {"role": "user", "content": prompt},
+    ]
+
+def _split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
 
+async def _complete(prompt: str, persona: str) -> str:
+    started = time.perf_counter()
+    resp = await client.chat.completions.create(
+        model=MODEL,
+        messages=_messages(prompt, persona),
+        temperature=0.7,
+    )
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm")
+    LLM_CALLS.inc(persona=persona, result="ok")
+    return resp.choices[0].message.content.strip()
+
+async def _stream_completion(prompt: str, persona: str):
+    started = time.perf_counter()
+    stream = await client.chat.completions.create(
+        model=MODEL,
+        messages=_messages(prompt, persona),
+        temperature=0.7,
+        stream=True,
+    )
+    buffer = ""
+    first = True
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        buffer += chunk.choices[0].delta.content or ""
+        *complete, buffer = SENTENCE_END.split(buffer)
+        for sentence in complete:
+            if not sentence.strip():
+                continue
+            if first:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm_first_sentence")
+                first = False
+            yield sentence.strip()
+    if buffer.strip():
+        yield buffer.strip()
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="llm")
+    LLM_CALLS.inc(persona=persona, result="ok")
+
+async def _feedback_sentences(payload: dict, persona: str):
+    # cached text is split up front; a miss streams from the LLM so the first
+    # sentence can be synthesised while the rest is still being generated
+    key = _cache_key(payload, persona)
+    prompt = _build_prompt(_bucketed(payload))
+    try:
+        text = llm_cache.peek(key, refill=partial(_complete, prompt, persona)) or await llm_cache.join(key)
+    except Exception:
+        text = FALLBACK_TEXT
+    if text is not None:
+        for sentence in _split_sentences(text):
+            yield sentence
+        return
+
+    llm_cache.track(key)
+    sentences, error, finished = [], None, False
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a concise fitness coach. "
-                        "Return 1–3 short sentences: "
-                        "1) praise/motivation, "
-                        "2) one actionable cue, "
-                        "3) a target for next set. "
-                        "Avoid emojis. Keep under 40 words. Don't start with 'here are three sentences' or anything. Provide directly with the sentences. "
-                        f"Style: {style}"
-                    ),
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-        )
-        return resp.choices[0].message.content.strip()
+        async for sentence in _stream_completion(prompt, persona):
+            sentences.append(sentence)
+            yield sentence
+        finished = True
     except Exception as e:
-        print("[LLM] fallback:", e)
-        return "Keep your form tight and steady Queen! You got this."
+        error = e
+    finally:
+        complete = finished and sentences
+        llm_cache.resolve(key, " ".join(sentences) if complete else None,
+                          error or RuntimeError("completion abandoned"))
+    if error is not None:
+        LLM_CALLS.inc(persona=persona, result="fallback")
+        log_event("llm_fallback", logging.WARNING, persona=persona, error=str(error))
+        if not sentences:
+            yield FALLBACK_TEXT
 
 def _piper_tts(text: str, persona: str) -> str:
-    piper_bin = shutil.which("piper-tts")
-    if not piper_bin:
-        raise HTTPException(status_code=500, detail="piper-tts not found")
-    model_path = PERSONA_TO_MODEL.get(persona, PERSONA_TO_MODEL["default"])
-    if not model_path.exists():
-        raise HTTPException(status_code=500, detail=f"Missing model {model_path}")
-    uid = uuid.uuid4().hex[:10]
-    out_path = STATIC_TMP / f"feedback_{persona}_{uid}.wav"
-    subprocess.run([piper_bin, "--model", str(model_path), "--output_file", str(out_path)],
-                   input=text.encode("utf-8"), check=True)
-    return f"/static/tmp/{out_path.name}"
+    model_path = PERSONA_TO_MODEL.get(persona, PERSONA_TO_MODEL[DEFAULT_PERSONA])
+    with STAGE_SECONDS.time(stage="tts"):
+        path = tts_cache.get(model_path, text)
+    return f"/static/tmp/{path.name}"
+
+async def _publish_chunks(job: dict, persona: str, queue: asyncio.Queue):
+    # sentences are synthesised concurrently but published to the job in order
+    while (item := await queue.get()) is not None:
+        sentence, audio = item
+        try:
+            audio_url = await audio
+        except Exception as e:
+            audio_url = None
+            log_event("tts_error", logging.WARNING, persona=persona, error=str(e))
+        job["chunks"].append({"index": len(job["chunks"]), "text": sentence, "audio_url": audio_url})
+        FEEDBACK_JOBS.notify(job)
+
+async def _run_feedback_job(job: dict) -> dict:
+    payload = job["payload"]
+    persona = payload.get("persona") or "default"
+    loop = asyncio.get_running_loop()
+    job["chunks"] = []
+    queue = asyncio.Queue()
+    publisher = asyncio.create_task(_publish_chunks(job, persona, queue))
+    try:
+        async for sentence in _feedback_sentences(payload, persona):
+            queue.put_nowait((sentence, loop.run_in_executor(tts_executor, _piper_tts, sentence, persona)))
+    finally:
+        queue.put_nowait(None)
+        await publisher
+
+    chunks = job["chunks"]
+    audio_urls = [c["audio_url"] for c in chunks if c["audio_url"]]
+    result = {
+        "text": " ".join(c["text"] for c in chunks),
+        "audio_url": audio_urls[0] if audio_urls else None,
+        "audio_urls": audio_urls,
+        "persona": persona,
+        "seq": job["seq"],
+    }
+    session = find_session(job["owner"])
+    if session is not None:
+        session.last_feedback = result
+        session.events.publish({"type": "feedback_ready", "job_id": job["id"], **result})
+    return result
+
+FEEDBACK_JOBS.runner = _run_feedback_job
 
 @router.get("/feedback/status")
-def feedback_status():
-    return {"ready": state.FEEDBACK_READY, "seq": state.FEEDBACK_SEQ}
+async def feedback_status(
+    job_id: str | None = Query(None),
+    wait: float = Query(0.0, ge=0.0, le=FEEDBACK_WAIT_SECONDS),
+    session: PoseSession = Depends(current_session),
+):
+    job = FEEDBACK_JOBS.get(job_id or session.feedback_job_id or "", owner=session.session_id)
+    if job_id and job is None:
+        raise HTTPException(status_code=404, detail="Unknown feedback job")
+    if job is not None and wait:
+        await FEEDBACK_JOBS.wait(job, wait)
+    return {
+        "ready": job is not None and job["status"] == "done",
+        "seq": session.feedback_seq,
+        "job": job_view(job),
+    }
 
 @router.post("/feedback")
-def feedback_endpoint(
+async def feedback_endpoint(
     body: FeedbackIn | None = Body(default=None),
     force: bool = Query(False),
+    wait: float = Query(FEEDBACK_WAIT_SECONDS, ge=0.0, le=FEEDBACK_WAIT_SECONDS),
+    session: PoseSession = Depends(current_session),
 ):
-    if not force and (not state.FEEDBACK_READY or not state.LAST_SET_SUMMARY):
-        return {"audio_url": None, "text": None, "seq": state.FEEDBACK_SEQ}
+    if body or force:
+        payload = body.dict() if body else _default_payload_from_session(session)
+        if not payload:
+            raise HTTPException(status_code=400, detail="No workout summary available")
+        payload["persona"] = payload.get("persona") or session.persona
+        job = FEEDBACK_JOBS.submit(session.session_id, payload, seq=session.feedback_seq)
+    else:
+        job = FEEDBACK_JOBS.get(session.feedback_job_id or "", owner=session.session_id)
+        if not session.feedback_ready or job is None:
+            return {"audio_url": None, "text": None, "seq": session.feedback_seq}
+        session.feedback_ready = False
 
-    state.FEEDBACK_READY = False
-    seq = state.FEEDBACK_SEQ
+    await FEEDBACK_JOBS.wait(job, wait)
+    if job["status"] == "done":
+        return job["result"]
+    return {"audio_url": None, "text": None, "seq": job["seq"], "job": job_view(job)}
 
-    payload = body.dict() if body else _default_payload_from_state()
-    if not payload:
-        raise HTTPException(status_code=400, detail="No workout summary available")
-    payload.setdefault("persona", getattr(state, "PERSONA", "default"))
+async def _job_events(job: dict):
+    sent = 0
+    deadline = time.monotonic() + FEEDBACK_WAIT_SECONDS
+    while True:
+        chunks = job.get("chunks") or []
+        while sent < len(chunks):
+            yield json.dumps({"type": "sentence", **chunks[sent]}) + "\n"
+            sent += 1
+        if job["finished_at"] is not None or time.monotonic() >= deadline:
+            break
+        await FEEDBACK_JOBS.changed(job, deadline - time.monotonic())
+    if job["status"] == "done":
+        event = {"type": "done", "text": job["result"]["text"], "seq": job["seq"]}
+    else:
+        event = {"type": "error", "status": job["status"], "error": job["error"], "seq": job["seq"]}
+    yield json.dumps(event) + "\n"
 
-    prompt = _build_prompt(payload)
-    text = _call_openrouter(prompt, payload["persona"])
-
-    audio_url = None
-    try:
-        audio_url = _piper_tts(text, payload["persona"])
-    except Exception as e:
-        print("[TTS] error:", e)
-
-    state.LAST_FEEDBACK = {"text": text, "audio_url": audio_url,
-                           "persona": payload["persona"], "seq": seq}
-    return state.LAST_FEEDBACK
+@router.get("/feedback/stream")
+async def feedback_stream(
+    job_id: str | None = Query(None),
+    session: PoseSession = Depends(current_session),
+):
+    job = FEEDBACK_JOBS.get(job_id or session.feedback_job_id or "", owner=session.session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown feedback job")
+    return StreamingResponse(_job_events(job), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache"})
 
 @router.get("/feedback/last")
-def feedback_last():
-    return getattr(state, "LAST_FEEDBACK", {"status": "no_feedback"})
+def feedback_last(session: PoseSession = Depends(current_session)):
+    return session.last_feedback or {"status": "no_feedback"}
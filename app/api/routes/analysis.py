@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from app.api.utils.offline import analyze_video_async, process_pool
+from app.api.utils.users import get_current_user
+
+router = APIRouter(prefix="/analysis", tags=["analysis"])
+
+_executor = None
+
+
+def start_pool():
+    # called from the app lifespan; workers are spawned on first use
+    global _executor
+    if _executor is None:
+        _executor = process_pool()
+
+
+def stop_pool():
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _save_upload(video: UploadFile) -> str:
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(video.file, tmp)
+    return tmp.name
+
+
+@router.post("/video")
+async def analyze_video_upload(
+    video: UploadFile = File(...),
+    exercise: str = Query("squat"),
+    user: dict = Depends(get_current_user),
+):
+    if _executor is None:
+        raise HTTPException(status_code=503, detail="Video analysis is not available")
+    path = await run_in_threadpool(_save_upload, video)
+    try:
+        summary = await analyze_video_async(path, exercise, _executor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.unlink(path)
+    summary["source"] = video.filename
+    return summary
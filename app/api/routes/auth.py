@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Response, Depends, Header
-from app.api.utils.db import users_collection
-from app.api.utils.auth import hash_password, verify_password, create_access_token, decode_access_token
+from fastapi import APIRouter, HTTPException, Response, Depends, Query
+from app.api.utils.db import users_collection, workouts_collection
+from app.api.utils.workout_store import WORKOUT_WRITER, PAGE_SIZE, list_workouts
+from app.api.utils.auth import hash_password_async, verify_password_async, create_access_token, PasswordHashBusy
+from app.api.utils.users import get_current_user, invalidate_user
 from app.api.models.user import UserSignup
 from pydantic import BaseModel
-import app.api.utils.state as state
+from app.api.utils.session import get_session
+from app.api.utils.personas import PERSONAS
 
 class LoginRequest(BaseModel):
     username: str
@@ -22,15 +25,18 @@ async def signup(user: UserSignup):
     if existing:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    hashed_pw = hash_password(user.password)
+    try:
+        hashed_pw = await hash_password_async(user.password)
+    except PasswordHashBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     new_user = {
         "username": user.username,
         "password": hashed_pw,
         "email": user.email,
-        "workouts": [],
         "persona": "default"
     }
     await users_collection.insert_one(new_user)
+    invalidate_user(user.username)
     return {"status": "ok", "msg": "User created successfully"}
 
 
@@ -38,14 +44,19 @@ async def signup(user: UserSignup):
 @router.post("/login")
 async def login(data: LoginRequest, response: Response):
     user = await users_collection.find_one({"username": data.username})
-    if not user or not verify_password(data.password, user["password"]):
+    try:
+        valid = bool(user) and await verify_password_async(data.password, user["password"])
+    except PasswordHashBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token({"username": data.username})
 
     first_time = user.get("persona", "default") == "default"
-    state.PERSONA = user.get("persona", "default")
-    state.CURRENT_USER = data.username
+    session = get_session(data.username)
+    session.persona = user.get("persona", "default")
+    session.current_user = data.username
 
     return {
         "status": "ok",
@@ -55,46 +66,45 @@ async def login(data: LoginRequest, response: Response):
     }
 
 
-# ---------- Dependency ----------
-async def get_current_user(Authorization: str = Header(None)):
-    if not Authorization or not Authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    token = Authorization.split(" ")[1]
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    username = payload.get("username")
-    user = await users_collection.find_one({"username": username})
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    return user
-
-
-
 @router.get("/dashboard")
-async def dashboard(user: dict = Depends(get_current_user)):
-    workouts = user.get("workouts", [])
-    return {
+async def dashboard(
+    user: dict = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE, ge=1, le=200),
+    cursor: str | None = Query(None),
+    fields: str | None = Query(None, description="comma-separated workout fields"),
+    since: float | None = Query(None, description="unix seconds, inclusive"),
+    until: float | None = Query(None, description="unix seconds, exclusive"),
+):
+    # read-your-writes: the caller's own workouts still in the write-behind buffer go first
+    await WORKOUT_WRITER.flush_user(user["username"])
+    try:
+        page = await list_workouts(user["username"], limit=limit, cursor=cursor,
+                                   fields=fields.split(",") if fields else None,
+                                   since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = {
         "username": user["username"],
         "email": user["email"],
         "persona": user.get("persona", "default"),
-        "total_workouts": len(workouts),
-        "workouts": workouts
+        **page,
     }
+    if cursor is None:
+        # counted once per listing; later pages only need next_cursor
+        response["total_workouts"] = await workouts_collection.count_documents({"username": user["username"]})
+    return response
 
 
 @router.post("/set_persona")
 async def set_persona(data: PersonaChoice, user: dict = Depends(get_current_user)):
     persona = data.persona
-    if persona not in ["goggins", "barbie", "default"]:
+    if persona not in PERSONAS:
         raise HTTPException(status_code=400, detail="Invalid persona choice")
 
     await users_collection.update_one(
         {"username": user["username"]},
         {"$set": {"persona": persona}}
     )
-    state.PERSONA = persona
+    invalidate_user(user["username"])
+    get_session(user["username"]).persona = persona
     return {"status": "ok", "msg": f"Persona set to {persona}"}
@@ -0,0 +1,47 @@
+import json
+import asyncio
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.api.utils.session import PoseSession, current_session
+
+router = APIRouter(prefix="", tags=["events"])
+
+KEEPALIVE_SECONDS = 15.0
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def _event_stream(session: PoseSession):
+    queue = session.events.subscribe()
+    try:
+        yield "retry: 2000\n\n"
+        yield _sse({
+            "type": "hello",
+            "exercise": session.exercise,
+            "reps": session.last_rep_seen,
+            "set_active": session.set_active,
+            "persona": session.persona,
+            "seq": session.feedback_seq,
+            "feedback_job_id": session.feedback_job_id,
+        })
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(event)
+    finally:
+        session.events.unsubscribe(queue)
+
+
+@router.get("/events")
+def coaching_events(session: PoseSession = Depends(current_session)):
+    # reps, audio cues (same cooldowns as /coach_cue), set ends and feedback
+    # readiness, pushed from the engine as they happen
+    return StreamingResponse(_event_stream(session), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
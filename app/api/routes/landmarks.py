@@ -0,0 +1,86 @@
+import json
+import time
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from starlette.concurrency import run_in_threadpool
+
+from app.api.utils.engine import process_landmarks, overlay_color
+from app.api.utils.session import PoseSession, get_session, session_id_from_token
+from app.api.utils.metrics import STAGE_SECONDS, FRAMES_PROCESSED
+from app.api.utils.cues import cue_texts
+
+router = APIRouter(prefix="/ws", tags=["landmarks"])
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4
+FRAME_BYTES = NUM_LANDMARKS * LANDMARK_DIMS * 4
+
+
+def _decode_frames(message: dict) -> np.ndarray:
+    if message.get("bytes") is not None:
+        raw = message["bytes"]
+        if not raw or len(raw) % FRAME_BYTES:
+            raise ValueError(f"expected a multiple of {FRAME_BYTES} bytes, got {len(raw)}")
+        return np.frombuffer(raw, dtype="<f4").reshape(-1, NUM_LANDMARKS, LANDMARK_DIMS)
+    try:
+        frames = np.asarray(json.loads(message.get("text") or "null"), dtype=np.float32)
+    except TypeError:
+        # objects and other non-numeric JSON; ragged or string arrays raise ValueError already
+        raise ValueError("expected a numeric array of landmarks")
+    if frames.ndim == 2:
+        frames = frames[None]
+    if frames.ndim != 3 or frames.shape[1:] != (NUM_LANDMARKS, LANDMARK_DIMS):
+        raise ValueError(f"expected (N, {NUM_LANDMARKS}, {LANDMARK_DIMS}) landmarks, got {frames.shape}")
+    return frames
+
+
+def _process_batch(session: PoseSession, frames: np.ndarray) -> dict:
+    with session.lock:
+        for data in frames:
+            started = time.perf_counter()
+            result = process_landmarks(session, data)
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="analysis")
+    FRAMES_PROCESSED.inc(len(frames), source="landmarks", pose="true")
+    return {
+        "exercise": result["exercise"],
+        "reps": result["reps"],
+        "cues": cue_texts(result["mistakes"]),
+        "set_active": result["set_active"],
+        "color": overlay_color(result),
+    }
+
+
+@router.websocket("/landmarks")
+async def landmarks_ws(websocket: WebSocket, token: str | None = Query(None)):
+    try:
+        session = get_session(session_id_from_token(token))
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    session.sockets += 1
+    recording = session.start_recording()
+    last_sent = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                frames = _decode_frames(message)
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            if not len(frames):
+                continue
+            update = await run_in_threadpool(_process_batch, session, frames)
+            if update != last_sent:
+                await websocket.send_json(update)
+                last_sent = update
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.sockets -= 1
+        if recording:
+            await run_in_threadpool(session.stop_recording)
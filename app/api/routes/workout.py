@@ -1,10 +1,10 @@
 import time
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Header
-from app.api.utils.db import users_collection
-from app.api.utils.auth import decode_access_token
-import app.api.utils.state as state
-from app.api.routes.auth import get_current_user
+from fastapi import APIRouter, Depends, Query, HTTPException
+from app.api.utils.workout_store import WORKOUT_WRITER, WorkoutBufferFull, workout_stats
+from app.api.utils.session import get_session
+from app.api.utils.users import get_current_user
+from app.api.utils.personas import DEFAULT_PERSONA
 
 router = APIRouter(prefix="/workouts", tags=["workouts"])
 
@@ -17,27 +17,16 @@ def format_timestamp(ts: float) -> str:
 @router.post("/save")
 async def save_workout(
     workout: dict,
-    Authorization: str = Header(None)
+    user: dict = Depends(get_current_user)
 ):
-    if not Authorization or not Authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
-    token = Authorization.split(" ")[1]
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    username = payload.get("username")
-    if not username:
-        raise HTTPException(status_code=401, detail="Invalid user in token")
-
-    workout.setdefault("persona", state.PERSONA or "default")
+    username = user["username"]
+    workout.setdefault("persona", user.get("persona", DEFAULT_PERSONA))
     workout.setdefault("created_at", time.time())
 
-    await users_collection.update_one(
-        {"username": username},
-        {"$push": {"workouts": workout}}
-    )
+    try:
+        WORKOUT_WRITER.add(username, [workout])
+    except WorkoutBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     return {
         "status": "ok",
         "msg": "Workout saved",
@@ -51,24 +40,32 @@ async def save_workout(
 @router.post("/flush")
 async def flush_workouts(user: dict = Depends(get_current_user)):
  
-    if not state.WORKOUTS_BUFFER:
+    session = get_session(user["username"])
+    if not session.workouts_buffer:
         return {"status": "empty", "msg": "No workouts to save"}
 
-    for w in state.WORKOUTS_BUFFER:
+    for w in session.workouts_buffer:
         w.setdefault("created_at", time.time())
-        w.setdefault("persona", state.PERSONA or "default")
+        w.setdefault("persona", session.persona)
 
-    await users_collection.update_one(
-        {"username": user["username"]},
-        {"$push": {"workouts": {"$each": state.WORKOUTS_BUFFER}}}
-    )
+    try:
+        WORKOUT_WRITER.add(user["username"], session.workouts_buffer)
+    except WorkoutBufferFull as e:
+        # the session keeps its buffer, so the client can simply retry
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
     saved = [
         {**w, "created_at_human": format_timestamp(w["created_at"])}
-        for w in state.WORKOUTS_BUFFER
+        for w in session.workouts_buffer
     ]
 
-    saved_count = len(state.WORKOUTS_BUFFER)
-    state.WORKOUTS_BUFFER.clear()
+    saved_count = len(session.workouts_buffer)
+    session.workouts_buffer.clear()
 
     return {"status": "ok", "saved": saved_count, "workouts": saved}
+
+
+@router.get("/stats")
+async def stats(weeks: int = Query(12, ge=1, le=104), user: dict = Depends(get_current_user)):
+    await WORKOUT_WRITER.flush_user(user["username"])
+    return await workout_stats(user["username"], weeks=weeks)
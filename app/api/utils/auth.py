@@ -1,17 +1,40 @@
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import os
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
 
+from app.api.utils.ttl_cache import TTLCache
+from app.api.utils.metrics import AUTH_CACHE_LOOKUPS
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback_secret_key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+TOKEN_CACHE_SECONDS = float(os.getenv("TOKEN_CACHE_SECONDS", 300))
+
+# token -> verified payload; entries never outlive the token's own exp
+_token_cache = TTLCache(max_entries=4096, ttl=TOKEN_CACHE_SECONDS)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so a few threads hash in parallel without stalling the loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# hashes allowed to wait for a worker before new requests are turned away
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 32))
+_hash_executor = ThreadPoolExecutor(PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hashes_in_flight = 0
+_hash_lock = threading.Lock()
+
+
+class PasswordHashBusy(RuntimeError):
+    pass
+
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -21,6 +44,33 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _release_hash(_future):
+    global _hashes_in_flight
+    with _hash_lock:
+        _hashes_in_flight -= 1
+
+
+async def _run_hash(fn, *args):
+    global _hashes_in_flight
+    with _hash_lock:
+        if _hashes_in_flight >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE:
+            raise PasswordHashBusy("Too many concurrent logins, retry shortly")
+        _hashes_in_flight += 1
+    future = _hash_executor.submit(fn, *args)
+    # released when the hash actually finishes (or is cancelled before starting),
+    # not when the awaiting request goes away, so disconnects can't overfill the pool
+    future.add_done_callback(_release_hash)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash(hash_password, password)
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await _run_hash(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MINUTES):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_delta)
@@ -28,9 +78,21 @@ def create_access_token(data: dict, expires_delta: int = ACCESS_TOKEN_EXPIRE_MIN
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def bearer_token(authorization: str | None) -> str | None:
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return authorization.split(" ", 1)[1]
+
+
 def decode_access_token(token: str):
+    payload = _token_cache.get(token)
+    if payload is not None:
+        AUTH_CACHE_LOOKUPS.inc(cache="token", result="hit")
+        return dict(payload)
+    AUTH_CACHE_LOOKUPS.inc(cache="token", result="miss")
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    _token_cache.set(token, dict(payload), ttl=payload.get("exp", 0) - time.time())
+    return payload
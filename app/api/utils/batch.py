@@ -0,0 +1,27 @@
+import numpy as np
+
+from app.api.utils.landmarks import angle_between, ema_update
+from app.api.utils.rep_counter import rep_boundaries
+from app.api.exercise_modules import EXERCISES
+
+BATCH_ANALYZERS = {name: ex for name, ex in EXERCISES.items() if ex.batch is not None}
+
+
+def analyze_sequence(exercise: str, raw_landmarks: np.ndarray,
+                     good_min_frames: int = 5, bad_min_frames: int = 2) -> dict:
+    if exercise not in BATCH_ANALYZERS:
+        raise ValueError(f"Unknown exercise '{exercise}'")
+    entry = BATCH_ANALYZERS[exercise]
+    thresholds, _ = entry.config(angle_between, ema_update)
+    codes = entry.batch(raw_landmarks, thresholds)
+    cues = entry.cues
+    good = codes[:, 0] < 0
+    rep_frames = rep_boundaries(good, good_min_frames, bad_min_frames)
+    return {
+        "exercise": exercise,
+        "cues": cues,
+        "codes": codes,
+        "good": good,
+        "rep_frames": rep_frames,
+        "reps": len(rep_frames),
+    }
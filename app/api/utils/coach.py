@@ -0,0 +1,34 @@
+import app.api.utils.state as state
+from app.api.utils.cues import cue_text
+from app.api.utils.cue_audio import CUE_AUDIO
+from app.api.utils.metrics import TTS_CUES
+
+
+def next_cue(session, now: float | None = None) -> dict | None:
+    # the one audio cue due now, if any; shared by /coach_cue polling and pushed events
+    now = session.clock() if now is None else now
+    if session.last_rep_seen > session.last_rep_spoken:
+        if now - session.last_tts_at >= state.TTS_COOLDOWN_REP:
+            n = session.last_rep_seen
+            key = f"REP_{n}"
+            url = CUE_AUDIO.url(session.persona, key)
+            session.last_rep_spoken = n
+            # counts past the precomputed range (NUM_MAX) have no clip; form cues still play
+            if url is not None:
+                session.last_tts_at = now
+                TTS_CUES.inc(persona=session.persona, kind="rep")
+                return {"url": url, "persona": session.persona, "key": key, "text": str(n), "kind": "rep"}
+    if now - session.last_tts_at < state.TTS_COOLDOWN_GLOBAL:
+        return None
+    for cue_key in session.current_cues:
+        if now - session.last_tts_per_key.get(cue_key, 0.0) < state.TTS_COOLDOWN_PER_KEY:
+            continue
+        url = CUE_AUDIO.url(session.persona, cue_key)
+        if url is None:
+            continue
+        session.last_tts_per_key[cue_key] = now
+        session.last_tts_at = now
+        TTS_CUES.inc(persona=session.persona, kind="cue")
+        return {"url": url, "persona": session.persona, "key": cue_key, "text": cue_text(cue_key),
+                "kind": "cue"}
+    return None
@@ -0,0 +1,69 @@
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+from app.api.utils.log import log_event
+from app.api.utils.personas import DEFAULT_PERSONA
+
+CUE_AUDIO_DIR = Path(__file__).resolve().parents[2] / "static" / "tts"
+MANIFESTS = ("tts_manifest.json", "rep_manifest.json")
+
+MEDIA_TYPES = {".wav": "audio/wav", ".ogg": "audio/ogg", ".mp3": "audio/mpeg"}
+
+
+class CueAudio:
+    # Precomputed persona clips (scripts/cache_voice.py) held in memory, keyed by
+    # (persona, cue code). A persona missing a clip falls back to the default voice.
+
+    def __init__(self, root: Path = CUE_AUDIO_DIR):
+        self.root = Path(root)
+        self._clips = {}
+
+    def load(self) -> int:
+        clips = {}
+        persona_dirs = sorted(p for p in self.root.iterdir() if p.is_dir()) if self.root.is_dir() else []
+        for persona_dir in persona_dirs:
+            for manifest in MANIFESTS:
+                path = persona_dir / manifest
+                if not path.exists():
+                    continue
+                try:
+                    entries = json.loads(path.read_text())
+                except ValueError as e:
+                    log_event("cue_manifest_invalid", logging.WARNING, path=str(path), error=str(e))
+                    continue
+                for key, url in entries.items():
+                    # manifests hold /static URLs; the file sits next to the manifest
+                    clip = persona_dir / Path(url).name
+                    if not clip.is_file():
+                        continue
+                    data = clip.read_bytes()
+                    version = hashlib.sha1(data).hexdigest()[:16]
+                    clips[(persona_dir.name, key)] = {
+                        "data": data,
+                        "version": version,
+                        "etag": f'"{version}"',
+                        "media_type": MEDIA_TYPES.get(clip.suffix, "application/octet-stream"),
+                    }
+        # swapped whole so concurrent lookups never see a half-built index
+        self._clips = clips
+        log_event("cue_audio_loaded", clips=len(clips), bytes=sum(len(c["data"]) for c in clips.values()))
+        return len(clips)
+
+    def get(self, persona: str, key: str) -> dict | None:
+        clips = self._clips
+        return clips.get((persona, key)) or clips.get((DEFAULT_PERSONA, key))
+
+    def url(self, persona: str, key: str) -> str | None:
+        clip = self._clips.get((persona, key))
+        if clip is None:
+            persona = DEFAULT_PERSONA
+            clip = self._clips.get((persona, key))
+        if clip is None:
+            return None
+        # the content hash in the URL lets clients cache the clip forever
+        return f"/coach_audio/{persona}/{key}?v={clip['version']}"
+
+
+CUE_AUDIO = CueAudio()
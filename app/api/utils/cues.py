@@ -0,0 +1,28 @@
+# Stable cue codes emitted by the analyzers. The codes key the precomputed
+# persona audio (scripts/cache_voice.py); the text is only for display and summaries.
+CUE_TEXT = {
+    "GET_ON_FLOOR":          "Get on the floor.",
+    "HOLD_PLANK":            "Hold a straight plank.",
+    "HANDS_CLOSER":          "Bring hands closer.",
+    "HANDS_WIDER":           "Move hands wider.",
+    "HANDS_UNDER_SHOULDERS": "Hands under shoulders.",
+    "LIFT_HIPS":             "Lift hips.",
+    "LOWER_HIPS":            "Lower hips.",
+    "GO_LOWER":              "Go lower.",
+    "STEP_BACK":             "Step back; show knees/ankles.",
+    "SQUAT_GO_DEEPER":       "Go deeper.",
+    "SQUAT_CHEST_UP":        "Chest up.",
+    "SQUAT_KNEE_OUT_LEFT":   "Push left knee out.",
+    "SQUAT_KNEE_OUT_RIGHT":  "Push right knee out.",
+}
+
+# the user is out of position rather than moving badly
+SETUP_CUES = frozenset({"GET_ON_FLOOR", "HOLD_PLANK", "STEP_BACK"})
+
+
+def cue_text(code: str) -> str:
+    return CUE_TEXT.get(code, code)
+
+
+def cue_texts(codes) -> list[str]:
+    return [CUE_TEXT.get(c, c) for c in codes]
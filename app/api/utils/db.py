@@ -1,7 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
 import os
+import logging
 from dotenv import load_dotenv
 
+from app.api.utils.log import log_event
+
 load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
@@ -9,3 +13,11 @@ DB_NAME = os.getenv("DB_NAME")
 client = AsyncIOMotorClient(MONGO_URI, tls=True, tlsAllowInvalidCertificates=True)
 db = client[DB_NAME]
 users_collection = db["users"]
+workouts_collection = db["workouts"]
+
+
+async def ensure_indexes():
+    try:
+        await workouts_collection.create_index([("username", 1), ("created_at", -1)])
+    except PyMongoError as e:
+        log_event("db_index_failed", logging.WARNING, error=str(e))
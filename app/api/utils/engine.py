@@ -1,38 +1,33 @@
+import json
 import time
+from collections import Counter
+from functools import partial
+
 import cv2
 import numpy as np
 import mediapipe as mp
 
-from app.api.utils import state
-from app.api.utils.rep_counter import RepCounter
-from app.api.utils.gestures import GestureSwitch
-from app.api.exercise_modules.squat import get_squat_config, analyze_squat
-from app.api.exercise_modules.pushup import get_pushup_config, analyze_pushup
-from app.api.exercise_modules.rest import get_rest_config, analyze_rest
+from app.api.utils.session import PoseSession
+from app.api.utils.pipeline import FramePipeline
+from app.api.utils.stream import MJPEGEncoder
+from app.api.utils.render import FramePool, cached_skeleton_specs, put_text
+from app.api.utils.metrics import STAGE_SECONDS, FRAMES_PROCESSED, FRAMES_DROPPED, REPS_COUNTED
+from app.api.utils.log import log_event
+from app.api.utils.jobs import FEEDBACK_JOBS
+from app.api.utils.cues import cue_text, cue_texts
+from app.api.utils.coach import next_cue
+from app.api.utils.gestures import GESTURE_PROMPTS
+from app.api.exercise_modules import EXERCISES, GESTURES, REST
 from app.api.utils.landmarks import (
     normalize_landmarks,
-    angle_between,
-    ema_update,
-    is_setup_issue,
-    skeleton_specs,
-    GREEN, ORANGE, RED,
+    skeleton_color,
+    COLOR_NAMES,
+    GREEN, RED, GRAY,
 )
 
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
-CONFIG = {"exercise": "squat"}
-thresholds, deques, smoothed = get_squat_config(angle_between, ema_update)
-
-rep_counter = RepCounter(good_min_frames=5, bad_min_frames=2)
-gesture_switch = GestureSwitch(hand_raise_frames=10, plank_frames=10, cooldown_frames=30)
-
-LAST_REP_FROZEN = 0
-REP_FREEZE_UNTIL = 0.0
 REST_MIN_SECONDS = 0.0
 
 
@@ -42,174 +37,307 @@ def _mmss(seconds: float) -> str:
     return f"{m:02d}:{s:02d}"
 
 
-def _set_active_exercise(ex_name: str):
-    global thresholds, deques, smoothed, rep_counter
-    CONFIG["exercise"] = ex_name
-    rep_counter.reset()
-    gesture_switch.reset()
-    state.LAST_REP_SEEN = 0
-    state.LAST_REP_SPOKEN = 0
-    state.PENDING_REP = None
-    state.LAST_REP_ANNOUNCED_AT = 0.0
-    if ex_name == "squat":
-        thresholds, deques, smoothed = get_squat_config(angle_between, ema_update)
-    elif ex_name == "pushup":
-        thresholds, deques, smoothed = get_pushup_config(angle_between, ema_update)
-    elif ex_name == "rest":
-        thresholds, deques, smoothed = get_rest_config(angle_between, ema_update)
-    else:
-        thresholds, deques, smoothed = get_squat_config(angle_between, ema_update)
-        CONFIG["exercise"] = "squat"
+def _set_active_exercise(session: PoseSession, ex_name: str):
+    session.load_exercise(ex_name)
+    session.rep_counter.reset()
+    session.gesture_switch.reset()
+    session.last_rep_seen = 0
+    session.last_rep_spoken = 0
+    session.pending_rep = None
+    session.last_rep_announced_at = 0.0
+    session.events.publish({"type": "exercise", "exercise": session.exercise})
 
 
-def set_config_handler(exercise: str):
-    if exercise not in {"squat", "pushup", "rest"}:
+def set_config_handler(session: PoseSession, exercise: str):
+    if exercise not in EXERCISES:
         return {"status": "error", "msg": f"Unknown exercise '{exercise}'"}
-    _set_active_exercise(exercise)
-    if exercise == "rest":
-        state.REST_START_TIME = time.monotonic()
-    return {"status": "ok", "exercise": CONFIG["exercise"]}
-
-
-
-def generate_frames():
-    global smoothed, LAST_REP_FROZEN, REP_FREEZE_UNTIL
-    with mp_pose.Pose(min_detection_confidence=0.5,
-                      min_tracking_confidence=0.5) as pose:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(image_rgb)
-            image = frame.copy()
-            mistakes = []
-            if results.pose_landmarks:
-                lm = results.pose_landmarks.landmark
-                data = np.array([[p.x, p.y, p.z, p.visibility] for p in lm], dtype=np.float32)
-                norm = normalize_landmarks(data)
-                suggestion = gesture_switch.detect(norm, CONFIG["exercise"])
-                end_set = False if CONFIG["exercise"] == "rest" else \
-                          gesture_switch.end_set_detect(norm, frames_required=12, debug=True)
-                if CONFIG["exercise"] == "rest":
-                    state.CURRENT_CUES = []
-                    if state.REST_START_TIME == 0.0:
-                        state.REST_START_TIME = time.monotonic()
-                    rest_elapsed = time.monotonic() - state.REST_START_TIME
-                    rest_str = _mmss(rest_elapsed)
-                    cv2.putText(image, f"REST {rest_str}", (12, 26),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (220, 220, 220), 2)
-                    cv2.putText(image, "Raise ONE hand to start SQUAT | Hold PLANK to start PUSH-UP",
-                                (12, 56), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
-                    if REST_MIN_SECONDS > 0 and (time.monotonic() - state.REST_START_TIME) < REST_MIN_SECONDS:
-                        pass
-                    else:
-                        if suggestion in ("squat", "pushup"):
-                            rest_duration = time.monotonic() - state.REST_START_TIME
-                            state.LAST_REST_SUMMARY = {
-                            "exercise" : "rest",
-                                "started_at": state.REST_START_TIME,
-                                "duration": rest_duration,
-                                "ended_at": time.monotonic(),
-                            }
-                            state.WORKOUTS_BUFFER.append(state.LAST_REST_SUMMARY)
-                            _set_active_exercise(suggestion)
-                            state.SET_ACTIVE = True
-                            state.SET_START_TIME = time.monotonic()
-                            state.SET_MISTAKES = []
-                            state.REST_START_TIME = 0.0
-                            print("DEBUG: Exiting REST → start", suggestion)
-                    now = time.monotonic()
-                    display_reps = LAST_REP_FROZEN if now < REP_FREEZE_UNTIL else 0
-                else:
-                    if CONFIG["exercise"] == "squat":
-                        mistakes, updated_smoothed = analyze_squat(
-                            norm, smoothed, deques, thresholds, data
-                        )
-                    elif CONFIG["exercise"] == "pushup":
-                        mistakes, updated_smoothed = analyze_pushup(
-                            norm, smoothed, deques, thresholds
-                        )
-                    else:
-                        mistakes, updated_smoothed = analyze_rest(norm, smoothed, deques, thresholds)
-                    smoothed.update(updated_smoothed)
-                    state.CURRENT_CUES = mistakes
-                    good_form_now = (len(mistakes) == 0)
-                    reps = rep_counter.update(good_form_now)
-                    if reps > state.LAST_REP_SEEN:
-                        state.LAST_REP_SEEN = reps
-                        if not state.SET_ACTIVE:
-                            state.SET_ACTIVE = True
-                            state.SET_START_TIME = time.monotonic()
-                            state.SET_MISTAKES = []
-                            print("DEBUG: Set auto-started because reps increased")
-                    if state.SET_ACTIVE and mistakes:
-                        state.SET_MISTAKES.extend(mistakes)
-                    if state.SET_ACTIVE and end_set:
-                        state.LAST_REP_SEEN = max(state.LAST_REP_SEEN, reps)
-                        state.SET_END_TIME = time.monotonic()
-                        duration = state.SET_END_TIME - state.SET_START_TIME
-                        summary = {
-                            "exercise": CONFIG["exercise"],
-                            "reps": state.LAST_REP_SEEN,
-                            "duration": duration,
-                            "mistakes": state.SET_MISTAKES.copy(),
-                            "persona": getattr(state, "PERSONA", "default"),
-                            "ended_at": time.time(),
-                        }
-                        state.WORKOUTS_BUFFER.append({
-                            "exercise": summary["exercise"],
-                            "duration": summary["duration"],
-                            "reps": summary["reps"]
-                        })
-                        state.FEEDBACK_SEQ += 1
-                        state.FEEDBACK_READY = True
-                        state.LAST_SET_SUMMARY = summary
-                        state.FEEDBACK_SEQ += 1
-                        state.FEEDBACK_READY = True
-                        print("SET_LOG:", summary)
-                        LAST_REP_FROZEN = state.LAST_REP_SEEN
-                        REP_FREEZE_UNTIL = time.monotonic() + 2.5
-                        _set_active_exercise("rest")
-                        state.SET_ACTIVE = False
-                        state.REST_START_TIME = time.monotonic()
-                        state.SET_MISTAKES.clear()
-                        _set_active_exercise("rest")
-                        state.SET_ACTIVE = False
-                        state.REST_START_TIME = time.monotonic()
-                    color = GREEN if good_form_now else (RED if is_setup_issue(mistakes) else ORANGE)
-                    lm_spec, conn_spec = skeleton_specs(color)
-                    mp_drawing.draw_landmarks(
-                        image,
-                        results.pose_landmarks,
-                        mp_pose.POSE_CONNECTIONS,
-                        landmark_drawing_spec=lm_spec,
-                        connection_drawing_spec=conn_spec,
-                    )
-                    now = time.monotonic()
-                    if now < REP_FREEZE_UNTIL:
-                        display_reps = LAST_REP_FROZEN
-                    else:
-                        display_reps = max(reps, state.LAST_REP_SEEN) if state.SET_ACTIVE else 0
-                    header = f"{CONFIG['exercise'].upper()} | Reps: {display_reps}"
-                    cv2.putText(image, header, (12, 26),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2)
-                    if state.SET_ACTIVE:
-                        cv2.putText(image, "SET ACTIVE", (12, 48),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 220, 255), 2)
-                    y0, dy = 70, 28
-                    if good_form_now:
-                        cv2.putText(image, "Good form!", (12, y0),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, GREEN, 2)
-                    else:
-                        for i, text in enumerate(mistakes[:3]):
-                            cv2.putText(image, text, (12, y0 + i * dy),
-                                        cv2.FONT_HERSHEY_SIMPLEX, 0.75, RED, 2)
-            else:
-                state.CURRENT_CUES = []
-            ok, buffer = cv2.imencode(".jpg", image)
-            if not ok:
-                continue
-            frame_bytes = buffer.tobytes()
-            yield (b"--frame\r\n"
-                   b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n")
\ No newline at end of file
+    with session.lock:
+        _set_active_exercise(session, exercise)
+        if exercise == REST:
+            session.rest_start_time = session.clock()
+        if session.recorder is not None:
+            session.recorder.mark_exercise(session.clock(), session.exercise)
+    return {"status": "ok", "exercise": session.exercise}
+
+
+
+def _stream(session: PoseSession, stages, encoder: MJPEGEncoder | None = None):
+    session.open()
+    pipeline = FramePipeline(
+        partial(_capture, session),
+        [("inference", partial(_infer, session)), *stages],
+        on_drop=partial(_on_drop, session.frame_pool),
+    )
+    # overlay streams have no encoder; don't report a previous /video stream's
+    session.pipeline = pipeline
+    session.encoder = encoder
+    pipeline.start()
+    try:
+        yield from pipeline
+    finally:
+        pipeline.stop()
+        with session.lock:
+            # a later viewer may have replaced it; only clear our own
+            if session.pipeline is pipeline:
+                session.pipeline = None
+                session.encoder = None
+        session.close()
+
+
+def generate_frames(session: PoseSession, encoder: MJPEGEncoder | None = None):
+    encoder = encoder or MJPEGEncoder()
+    for chunk in _stream(session, [("encode", partial(_encode, encoder, session.frame_pool))], encoder):
+        started = time.perf_counter()
+        yield chunk
+        encoder.record_sent(time.perf_counter() - started)
+
+
+def generate_overlay_events(session: PoseSession):
+    for event in _stream(session, [("serialize", partial(_overlay_event, session.frame_pool))]):
+        yield event
+
+
+def _on_drop(pool: FramePool, stage: str, packet):
+    FRAMES_DROPPED.inc(stage=stage)
+    item = packet[1]
+    if isinstance(item, tuple):
+        item = item[0]
+    if isinstance(item, np.ndarray):
+        pool.release(item)
+
+
+def _capture(session: PoseSession):
+    started = time.perf_counter()
+    with session.capture_lock:
+        if session.cap is None:
+            return None
+        buf = session.frame_pool.acquire(session.frame_shape) if session.frame_shape else None
+        ret, frame = session.cap.read(buf)
+    if not ret:
+        return None
+    session.frame_shape = frame.shape
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="capture")
+    return frame
+
+
+def _infer(session: PoseSession, frame):
+    with session.lock:
+        if session.pose is None:
+            return None
+        t0 = time.perf_counter()
+        session.rgb_buffer = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=session.rgb_buffer)
+        t1 = time.perf_counter()
+        results = session.pose.process(session.rgb_buffer)
+        t2 = time.perf_counter()
+        STAGE_SECONDS.observe(t1 - t0, stage="color")
+        STAGE_SECONDS.observe(t2 - t1, stage="pose")
+        if not results.pose_landmarks:
+            session.current_cues = []
+            FRAMES_PROCESSED.inc(source="video", pose="false")
+            return frame, None, None, None
+        # written straight into the session's landmark ring; the row stays valid for
+        # HISTORY_FRAMES frames, far longer than a frame spends in the pipeline
+        data = session.history.fill_landmarks(results.pose_landmarks.landmark)
+        result = process_landmarks(session, data)
+        STAGE_SECONDS.observe(time.perf_counter() - t2, stage="analysis")
+        FRAMES_PROCESSED.inc(source="video", pose="true")
+    return frame, results.pose_landmarks, data, result
+
+
+def _encode(encoder: MJPEGEncoder, pool: FramePool, item):
+    image, pose_landmarks, _, result = item
+    if encoder.skip_frame():
+        FRAMES_DROPPED.inc(stage="rate_limit")
+        pool.release(image)
+        return None
+    t0 = time.perf_counter()
+    if result is not None:
+        _draw_overlay(image, pose_landmarks, result)
+    t1 = time.perf_counter()
+    chunk = encoder.encode(image)
+    STAGE_SECONDS.observe(t1 - t0, stage="draw")
+    STAGE_SECONDS.observe(time.perf_counter() - t1, stage="encode")
+    pool.release(image)
+    return chunk
+
+
+def overlay_color(result: dict) -> str:
+    if result["rest"]:
+        return COLOR_NAMES[GRAY]
+    return COLOR_NAMES[skeleton_color(result["mistakes"])]
+
+
+def _overlay_event(pool: FramePool, item):
+    started = time.perf_counter()
+    image, _, data, result = item
+    pool.release(image)
+    if result is None:
+        event = {"pose": False}
+    else:
+        event = {
+            "pose": True,
+            "landmarks": np.round(data[:, [0, 1, 3]].astype(np.float64), 3).ravel().tolist(),
+            "color": overlay_color(result),
+            "exercise": result["exercise"],
+            "reps": result["reps"],
+            "set_active": result["set_active"],
+            "cues": cue_texts(result["mistakes"]),
+            "rest_elapsed": result["rest_elapsed"],
+        }
+    chunk = f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage="serialize")
+    return chunk
+
+
+def process_landmarks(session: PoseSession, data: np.ndarray) -> dict:
+    result = _analyze(session, data)
+    if session.events.active:
+        cue = next_cue(session)
+        if cue is not None:
+            session.events.publish({"type": "cue", **cue})
+    return result
+
+
+def _analyze(session: PoseSession, data: np.ndarray) -> dict:
+    data = session.history.push_landmarks(data)
+    if session.recorder is not None:
+        session.recorder.record(session.clock(), data, session.exercise)
+    norm = normalize_landmarks(data)
+    suggestion = session.gesture_switch.detect(norm, session.exercise, GESTURES)
+    end_set = False if session.exercise == REST else \
+              session.gesture_switch.end_set_detect(norm, frames_required=12, debug=True)
+    if session.exercise == REST:
+        session.current_cues = []
+        if session.rest_start_time == 0.0:
+            session.rest_start_time = session.clock()
+        rest_elapsed = session.clock() - session.rest_start_time
+        if REST_MIN_SECONDS > 0 and rest_elapsed < REST_MIN_SECONDS:
+            pass
+        else:
+            if suggestion in EXERCISES and suggestion != REST:
+                rest_duration = session.clock() - session.rest_start_time
+                session.last_rest_summary = {
+                    "exercise": REST,
+                    "started_at": session.rest_start_time,
+                    "duration": rest_duration,
+                    "ended_at": session.clock(),
+                }
+                session.workouts_buffer.append(session.last_rest_summary)
+                _set_active_exercise(session, suggestion)
+                session.set_active = True
+                session.set_start_time = session.clock()
+                session.set_mistakes = []
+                session.rest_start_time = 0.0
+                log_event("rest_ended", session=session.session_id, next=suggestion,
+                          duration=round(rest_duration, 2))
+        now = session.clock()
+        display_reps = session.last_rep_frozen if now < session.rep_freeze_until else 0
+        return {
+            "exercise": session.exercise,
+            "rest": True,
+            "rest_elapsed": rest_elapsed,
+            "mistakes": [],
+            "good_form": True,
+            "reps": display_reps,
+            "set_active": session.set_active,
+        }
+
+    mistakes, updated_smoothed = session.analyzer(
+        norm, session.smoothed, session.history, session.thresholds, data
+    )
+    session.smoothed.update(updated_smoothed)
+    session.current_cues = mistakes
+    good_form_now = (len(mistakes) == 0)
+    reps = session.rep_counter.update(good_form_now)
+    if reps > session.last_rep_seen:
+        REPS_COUNTED.inc(reps - session.last_rep_seen, exercise=session.exercise)
+        session.last_rep_seen = reps
+        session.events.publish({"type": "reps", "exercise": session.exercise, "reps": reps})
+        if not session.set_active:
+            session.set_active = True
+            session.set_start_time = session.clock()
+            session.set_mistakes = []
+            log_event("set_started", session=session.session_id, exercise=session.exercise,
+                      reason="reps")
+    if session.set_active and mistakes:
+        session.set_mistakes.extend(mistakes)
+    if session.set_active and end_set:
+        session.last_rep_seen = max(session.last_rep_seen, reps)
+        session.set_end_time = session.clock()
+        duration = session.set_end_time - session.set_start_time
+        summary = {
+            "exercise": session.exercise,
+            "reps": session.last_rep_seen,
+            "duration": duration,
+            "mistakes": cue_texts(session.set_mistakes),
+            "persona": session.persona,
+            "ended_at": time.time(),
+        }
+        session.workouts_buffer.append({
+            "exercise": summary["exercise"],
+            "duration": summary["duration"],
+            "reps": summary["reps"],
+            "mistakes": [{"cue": cue, "count": n} for cue, n in Counter(summary["mistakes"]).most_common()],
+        })
+        session.last_set_summary = summary
+        session.feedback_seq += 1
+        if session.feedback_enabled:
+            session.feedback_ready = True
+            session.feedback_job_id = FEEDBACK_JOBS.submit(
+                session.session_id, dict(summary), seq=session.feedback_seq)["id"]
+        log_event("set_ended", session=session.session_id,
+                  **{**summary, "mistakes": dict(Counter(session.set_mistakes))})
+        session.events.publish({"type": "set_ended", **summary, "mistakes": dict(Counter(summary["mistakes"])),
+                                "seq": session.feedback_seq, "feedback_job_id": session.feedback_job_id})
+        session.last_rep_frozen = session.last_rep_seen
+        session.rep_freeze_until = session.clock() + 2.5
+        _set_active_exercise(session, REST)
+        session.set_active = False
+        session.rest_start_time = session.clock()
+        session.set_mistakes.clear()
+    now = session.clock()
+    if now < session.rep_freeze_until:
+        display_reps = session.last_rep_frozen
+    else:
+        display_reps = max(reps, session.last_rep_seen) if session.set_active else 0
+    return {
+        "exercise": session.exercise,
+        "rest": False,
+        "rest_elapsed": None,
+        "mistakes": mistakes,
+        "good_form": good_form_now,
+        "reps": display_reps,
+        "set_active": session.set_active,
+    }
+
+
+def _rest_banner() -> str:
+    return " | ".join(f"{GESTURE_PROMPTS[ex.gesture]} to start {ex.label or ex.name.upper()}"
+                      for ex in EXERCISES.values() if ex.gesture is not None)
+
+
+def _draw_overlay(image, pose_landmarks, result: dict):
+    if result["rest"]:
+        put_text(image, f"REST {_mmss(result['rest_elapsed'])}", (12, 26), 0.9, (220, 220, 220))
+        put_text(image, _rest_banner(), (12, 56), 0.6, (180, 180, 180))
+        return
+    mistakes = result["mistakes"]
+    good_form_now = result["good_form"]
+    lm_spec, conn_spec = cached_skeleton_specs(skeleton_color(mistakes))
+    mp_drawing.draw_landmarks(
+        image,
+        pose_landmarks,
+        mp_pose.POSE_CONNECTIONS,
+        landmark_drawing_spec=lm_spec,
+        connection_drawing_spec=conn_spec,
+    )
+    header = f"{result['exercise'].upper()} | Reps: {result['reps']}"
+    put_text(image, header, (12, 26), 0.8, (200, 200, 200))
+    if result["set_active"]:
+        put_text(image, "SET ACTIVE", (12, 48), 0.8, (0, 220, 255))
+    y0, dy = 70, 28
+    if good_form_now:
+        put_text(image, "Good form!", (12, y0), 0.9, GREEN)
+    else:
+        for i, code in enumerate(mistakes[:3]):
+            put_text(image, cue_text(code), (12, y0 + i * dy), 0.75, RED)
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+MAX_PENDING = 64
+
+
+def _put(queue: asyncio.Queue, event: dict):
+    # a stalled client loses its oldest events rather than blocking the engine
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class EventChannel:
+    # Per-session fan-out of coaching events to connected clients.
+    # publish() is thread-safe: the frame pipeline threads and the event loop both call it.
+
+    def __init__(self, max_pending: int = MAX_PENDING):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(self.max_pending)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_put, queue, event)
@@ -1,5 +1,14 @@
 from dataclasses import dataclass
 
+# gestures GestureSwitch recognises; an exercise claims one with Exercise.gesture
+ONE_HAND_UP = "one_hand_up"
+PLANK = "plank"
+# how the rest screen tells the user to make each gesture
+GESTURE_PROMPTS = {
+    ONE_HAND_UP: "Raise ONE hand",
+    PLANK: "Hold PLANK",
+}
+
 @dataclass
 class GestureSwitch:
     hand_raise_frames: int = 10
@@ -7,18 +16,15 @@ class GestureSwitch:
     cooldown_frames: int = 30
 
     def __post_init__(self):
-        self._pushup_frames = 0
-        self._squat_frames  = 0
-        self._end_frames    = 0
-        self._cooldown      = 0
+        self.reset()
 
     def reset(self):
-        self._pushup_frames = 0
-        self._squat_frames  = 0
+        self._held = dict.fromkeys(GESTURE_PROMPTS, 0)
         self._end_frames    = 0
         self._cooldown      = 0
 
-    def detect(self, norm, current: str | None):
+    def detect(self, norm, current: str | None, targets: dict[str, str]):
+        # targets: {gesture: exercise}; returns the exercise to switch to, if any
         if self._cooldown > 0:
             self._cooldown -= 1
             return None
@@ -40,23 +46,15 @@ class GestureSwitch:
         both_above = left_above and right_above
         one_above  = (left_above ^ right_above)
 
-        if is_plank:
-            self._pushup_frames += 1
-        else:
-            self._pushup_frames = 0
-
-        if is_upright and one_above:
-            self._squat_frames += 1
-        else:
-            self._squat_frames = 0
-
-        if self._pushup_frames >= self.plank_frames and current != "pushup":
-            self._cooldown = self.cooldown_frames
-            return "pushup"
+        held = self._held
+        held[PLANK] = held[PLANK] + 1 if is_plank else 0
+        held[ONE_HAND_UP] = held[ONE_HAND_UP] + 1 if is_upright and one_above else 0
 
-        if self._squat_frames >= self.hand_raise_frames and current != "squat":
-            self._cooldown = self.cooldown_frames
-            return "squat"
+        for gesture, frames_required in ((PLANK, self.plank_frames), (ONE_HAND_UP, self.hand_raise_frames)):
+            target = targets.get(gesture)
+            if target is not None and held[gesture] >= frames_required and current != target:
+                self._cooldown = self.cooldown_frames
+                return target
 
         return None
 
@@ -0,0 +1,94 @@
+import numpy as np
+
+HISTORY_FRAMES = 64
+MAX_FEATURES = 16
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4
+
+
+class SessionHistory:
+    # Preallocated ring buffers for one session: the last `capacity` frames of raw
+    # landmarks plus up to `max_features` named per-frame features. Each feature
+    # keeps its own head and a running sum over its declared window, so append and
+    # rolling mean are O(1) and nothing is allocated per frame.
+
+    def __init__(self, capacity: int = HISTORY_FRAMES, max_features: int = MAX_FEATURES):
+        self.capacity = capacity
+        self.landmarks = np.zeros((capacity, NUM_LANDMARKS, LANDMARK_DIMS), dtype=np.float32)
+        self.frames = 0
+        self._values = np.zeros((max_features, capacity), dtype=np.float64)
+        self._slots = {}
+        self._windows = [0] * max_features
+        self._heads = [0] * max_features
+        self._counts = [0] * max_features
+        self._sums = [0.0] * max_features
+
+    def next_landmarks(self) -> np.ndarray:
+        # the slot the next push_landmarks() commits; fill it in place to skip a copy
+        return self.landmarks[self.frames % self.capacity]
+
+    def fill_landmarks(self, landmark_list) -> np.ndarray:
+        row = self.next_landmarks()
+        row[:] = [(p.x, p.y, p.z, p.visibility) for p in landmark_list]
+        return row
+
+    def push_landmarks(self, data: np.ndarray) -> np.ndarray:
+        row = self.next_landmarks()
+        if not np.may_share_memory(data, row):
+            row[:] = data
+        self.frames += 1
+        return row
+
+    def recent_landmarks(self, n: int) -> np.ndarray:
+        # oldest first; a copy, since the ring keeps moving underneath
+        n = min(n, self.frames, self.capacity)
+        idx = np.arange(self.frames - n, self.frames) % self.capacity
+        return self.landmarks[idx]
+
+    def configure(self, windows: dict[str, int]):
+        # called when the exercise changes; previous feature history is dropped
+        if len(windows) > len(self._windows):
+            raise ValueError(f"at most {len(self._windows)} features, got {len(windows)}")
+        if any(not 0 < w <= self.capacity for w in windows.values()):
+            raise ValueError(f"feature windows must be between 1 and {self.capacity}")
+        self._slots = {name: i for i, name in enumerate(windows)}
+        for name, i in self._slots.items():
+            self._windows[i] = windows[name]
+            self._heads[i] = 0
+            self._counts[i] = 0
+            self._sums[i] = 0.0
+
+    def append(self, name: str, value: float) -> float:
+        i = self._slots[name]
+        window, head = self._windows[i], self._heads[i]
+        values = self._values[i]
+        if self._counts[i] >= window:
+            self._sums[i] -= values[(head - window) % self.capacity]
+        else:
+            self._counts[i] += 1
+        values[head] = value
+        self._sums[i] += value
+        head = (head + 1) % self.capacity
+        self._heads[i] = head
+        if head == 0:
+            # resync once per lap so float error in the running sum cannot build up
+            self._sums[i] = float(self.window(name).sum())
+        return self._sums[i] / self._counts[i]
+
+    def count(self, name: str) -> int:
+        return self._counts[self._slots[name]]
+
+    def mean(self, name: str) -> float | None:
+        i = self._slots[name]
+        return self._sums[i] / self._counts[i] if self._counts[i] else None
+
+    def window(self, name: str) -> np.ndarray:
+        # the values inside the feature's window, oldest first
+        i = self._slots[name]
+        head, n = self._heads[i], self._counts[i]
+        if head >= n:
+            return self._values[i, head - n:head]
+        return np.concatenate((self._values[i, head - n:], self._values[i, :head]))
+
+    def max(self, name: str) -> float | None:
+        return float(self.window(name).max()) if self.count(name) else None
@@ -0,0 +1,109 @@
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from app.api.utils.log import log_event
+
+MAX_JOBS = 512
+
+
+class JobQueue:
+    # Runs an async `runner(job)` per submitted job on the app's event loop.
+    # submit() is thread-safe so the frame pipeline threads can enqueue work.
+
+    def __init__(self, name: str, runner=None, max_jobs: int = MAX_JOBS):
+        self.name = name
+        self.runner = runner
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        with self._lock:
+            pending = [job for job in self._jobs.values() if job["status"] == "queued"]
+        for job in pending:
+            self._schedule(job)
+
+    def submit(self, owner: str, payload: dict, **fields) -> dict:
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "owner": owner,
+            "status": "queued",
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            "_waiters": [],
+            **fields,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        if self._loop is not None:
+            self._schedule(job)
+        return job
+
+    def _schedule(self, job: dict):
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+
+    async def _run(self, job: dict):
+        if job["status"] != "queued":
+            return
+        job["status"] = "running"
+        try:
+            job["result"] = await self.runner(job)
+            job["status"] = "done"
+        except Exception as e:
+            job["status"] = "error"
+            job["error"] = str(e)
+            log_event("job_failed", logging.WARNING, queue=self.name, job=job["id"], error=str(e))
+        finally:
+            job["finished_at"] = time.time()
+            self.notify(job)
+
+    def notify(self, job: dict):
+        # wake wait()/changed() callers on partial progress as well as completion
+        for waiter in job["_waiters"]:
+            waiter.set()
+
+    def get(self, job_id: str, owner: str | None = None) -> dict | None:
+        job = self._jobs.get(job_id)
+        if job is None or (owner is not None and job["owner"] != owner):
+            return None
+        return job
+
+    async def changed(self, job: dict, timeout: float):
+        # must be awaited on the bound loop, the same one _run() and notify() run on
+        waiter = asyncio.Event()
+        job["_waiters"].append(waiter)
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            job["_waiters"].remove(waiter)
+
+    async def wait(self, job: dict, timeout: float) -> dict:
+        deadline = time.monotonic() + timeout
+        while job["finished_at"] is None and time.monotonic() < deadline:
+            await self.changed(job, deadline - time.monotonic())
+        return job
+
+
+def job_view(job: dict | None) -> dict | None:
+    if job is None:
+        return None
+    return {k: v for k, v in job.items() if not k.startswith("_") and k != "payload"}
+
+
+# set-end feedback (LLM + TTS); the runner is installed by routes/ai_feedback.py
+FEEDBACK_JOBS = JobQueue("feedback")
@@ -1,6 +1,10 @@
 import numpy as np
 import mediapipe as mp
+from scipy.signal import lfilter
 from mediapipe import solutions as mp_solutions
+
+from app.api.utils.cues import SETUP_CUES
+
 mp_drawing = mp.solutions.drawing_utils
 DrawingSpec = mp_solutions.drawing_utils.DrawingSpec
 
@@ -9,16 +13,15 @@ ORANGE = (0, 165, 255)
 GREEN  = (0, 255,   0)
 GRAY   = (160,160,160)
 
-SETUP_KEYWORDS = (
-    "get on the floor",
-    "step back; show knees/ankles",
-    "hold a straight plank",
-    "step back; show knees and ankles",
-)
-
 def is_setup_issue(mistakes: list[str]) -> bool:
-    low = " | ".join(m.lower() for m in mistakes)
-    return any(k in low for k in SETUP_KEYWORDS)
+    return any(m in SETUP_CUES for m in mistakes)
+
+COLOR_NAMES = {GREEN: "green", ORANGE: "orange", RED: "red", GRAY: "gray"}
+
+def skeleton_color(mistakes: list[str]):
+    if not mistakes:
+        return GREEN
+    return RED if is_setup_issue(mistakes) else ORANGE
 
 def skeleton_specs(color_bgr):
     lm_spec  = DrawingSpec(color=color_bgr, thickness=2, circle_radius=2)
@@ -47,3 +50,46 @@ def calculate_joint_angle(a, b, c):
 
 def ema_update(prev, new, alpha=0.2):
     return alpha * new + (1 - alpha) * prev if prev is not None else new
+
+def normalize_landmarks_batch(landmarks: np.ndarray, idxs=None):
+    hip_center = (landmarks[:, 23, :3] + landmarks[:, 24, :3]) / 2.0
+    shoulder_dist = np.linalg.norm(landmarks[:, 11, :3] - landmarks[:, 12, :3], axis=-1)
+    scale = np.where(shoulder_dist > 1e-6, shoulder_dist, 1.0).astype(landmarks.dtype)
+    points = landmarks[:, :, :3] if idxs is None else landmarks[:, idxs, :3]
+    return (points - hip_center[:, None, :]) / scale[:, None, None]
+
+def angle_between_batch(v1, v2, eps=1e-8):
+    n1 = np.linalg.norm(v1, axis=-1) + eps
+    n2 = np.linalg.norm(v2, axis=-1) + eps
+    cos = np.clip(np.sum(v1 * v2, axis=-1) / (n1 * n2), -1.0, 1.0)
+    return np.degrees(np.arccos(cos))
+
+def rolling_mean(values, window: int):
+    values = np.asarray(values, dtype=np.float64)
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    hi = np.arange(1, len(values) + 1)
+    lo = np.maximum(hi - window, 0)
+    return (csum[hi] - csum[lo]) / (hi - lo)
+
+def ema_scan(values, alpha=0.2):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return values.copy()
+    out = np.empty_like(values)
+    out[0] = values[0]
+    out[1:], _ = lfilter([alpha], [1.0, alpha - 1.0], values[1:], zi=[(1 - alpha) * values[0]])
+    return out
+
+def first_codes(candidates: np.ndarray, k: int = 2):
+    present = candidates >= 0
+    rank = np.cumsum(present, axis=1)
+    rows = np.arange(len(candidates))
+    codes = np.full((len(candidates), k), -1, dtype=np.int8)
+    for j in range(k):
+        hit = present & (rank == j + 1)
+        picked = candidates[rows, np.argmax(hit, axis=1)]
+        codes[:, j] = np.where(hit.any(axis=1), picked, -1)
+    return codes
+
+def decode_mistakes(codes: np.ndarray, cues) -> list[list[str]]:
+    return [[cues[c] for c in row if c >= 0] for row in codes.tolist()]
@@ -0,0 +1,99 @@
+import time
+import random
+import asyncio
+
+from app.api.utils.metrics import LLM_CACHE_LOOKUPS
+
+
+class LLMCache:
+    # Per-key pool of completions with a TTL. The first miss for a key waits on
+    # one upstream call shared by every concurrent caller; after that, callers get
+    # a random cached variant while the pool is topped up in the background.
+
+    def __init__(self, ttl: float, variants: int = 3, max_keys: int = 1024):
+        self.ttl = ttl
+        self.variants = variants
+        self.max_keys = max_keys
+        self._entries = {}
+        self._inflight = {}
+
+    def _fresh(self, key) -> list:
+        entry = self._entries.get(key)
+        if entry is None:
+            return []
+        now = time.monotonic()
+        entry[:] = [(text, created) for text, created in entry if now - created < self.ttl]
+        if not entry:
+            del self._entries[key]
+        return entry
+
+    def _store(self, key, text: str):
+        if key not in self._entries and len(self._entries) >= self.max_keys:
+            oldest = min(self._entries, key=lambda k: max(c for _, c in self._entries[k]))
+            del self._entries[oldest]
+        entry = self._entries.setdefault(key, [])
+        if text not in (t for t, _ in entry):
+            entry.append((text, time.monotonic()))
+        del entry[:-self.variants]
+
+    def _fetch(self, key, fetch) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            async def run():
+                try:
+                    text = await fetch()
+                    self._store(key, text)
+                    return text
+                finally:
+                    self._inflight.pop(key, None)
+            task = self._inflight[key] = asyncio.ensure_future(run())
+        return task
+
+    def peek(self, key, refill=None) -> str | None:
+        # a cached variant, or None; refill (like get()'s fetch) tops up a short pool
+        entry = self._fresh(key)
+        if not entry:
+            return None
+        LLM_CACHE_LOOKUPS.inc(result="hit")
+        if refill is not None and len(entry) < self.variants:
+            task = self._fetch(key, refill)
+            # background refill; its errors are only worth dropping
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return random.choice(entry)[0]
+
+    async def get(self, key, fetch) -> str:
+        # fetch: async callable returning a completion or raising; failures aren't cached
+        text = self.peek(key, fetch)
+        if text is not None:
+            return text
+        LLM_CACHE_LOOKUPS.inc(result="coalesced" if key in self._inflight else "miss")
+        return await asyncio.shield(self._fetch(key, fetch))
+
+    async def join(self, key) -> str | None:
+        # wait for an identical request already in flight, if there is one
+        pending = self._inflight.get(key)
+        if pending is None:
+            return None
+        LLM_CACHE_LOOKUPS.inc(result="coalesced")
+        return await asyncio.shield(pending)
+
+    def track(self, key) -> asyncio.Future:
+        # for producers that can't be wrapped in a fetch() call (streamed completions):
+        # identical requests await the returned future until resolve() is called
+        LLM_CACHE_LOOKUPS.inc(result="miss")
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    def resolve(self, key, text: str | None = None, error: Exception | None = None):
+        future = self._inflight.pop(key, None)
+        if text is not None:
+            self._store(key, text)
+        if future is not None and not future.done():
+            if text is not None:
+                future.set_result(text)
+            else:
+                future.set_exception(error or RuntimeError("completion failed"))
+
+    def clear(self):
+        self._entries.clear()
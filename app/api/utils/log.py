@@ -0,0 +1,34 @@
+import os
+import sys
+import json
+import logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+logger = logging.getLogger("posepal")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
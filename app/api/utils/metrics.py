@@ -0,0 +1,187 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# per-frame stages sit in the 1-50ms range, LLM/TTS calls in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(key, value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._fn = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn):
+        # evaluated at scrape time, for values that already live elsewhere
+        self._fn = fn
+
+    def _samples(self):
+        if self._fn is not None:
+            return [((), self._fn())]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            return [(key, (list(counts), total, n)) for key, (counts, total, n) in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, (counts, total, n) in self._samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "posepal_stage_seconds",
+    "Time spent in each processing stage: per frame for video stages, per call for llm/tts.",
+    ["stage"],
+)
+FRAMES_PROCESSED = Counter(
+    "posepal_frames_processed_total",
+    "Frames run through pose analysis.",
+    ["source", "pose"],
+)
+FRAMES_DROPPED = Counter(
+    "posepal_frames_dropped_total",
+    "Frames discarded before reaching the client.",
+    ["stage"],
+)
+ACTIVE_SESSIONS = Gauge(
+    "posepal_active_sessions",
+    "Sessions with an open camera stream.",
+)
+REPS_COUNTED = Counter(
+    "posepal_reps_total",
+    "Reps counted by the rep counter.",
+    ["exercise"],
+)
+TTS_CUES = Counter(
+    "posepal_tts_cues_total",
+    "Coach audio cues served.",
+    ["persona", "kind"],
+)
+TTS_CACHE_LOOKUPS = Counter(
+    "posepal_tts_cache_total",
+    "Feedback TTS cache lookups.",
+    ["result"],
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "posepal_llm_cache_total",
+    "Feedback LLM cache lookups.",
+    ["result"],
+)
+AUTH_CACHE_LOOKUPS = Counter(
+    "posepal_auth_cache_total",
+    "Decoded-token and user-principal cache lookups.",
+    ["cache", "result"],
+)
+LLM_CALLS = Counter(
+    "posepal_llm_calls_total",
+    "Feedback LLM calls.",
+    ["persona", "result"],
+)
@@ -0,0 +1,141 @@
+import os
+import json
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from app.api.utils.batch import analyze_sequence, BATCH_ANALYZERS
+from app.api.utils.landmarks import decode_mistakes
+from app.api.utils.cues import cue_texts
+
+mp_pose = mp.solutions.pose
+
+# frames decoded before each shard's start so the tracker is warm at its first frame
+OVERLAP_FRAMES = 30
+MIN_SHARD_FRAMES = 120
+
+
+def _video_info(path: str):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video '{path}'")
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    if frame_count <= 0:
+        raise ValueError(f"Cannot determine frame count of '{path}'")
+    return frame_count, fps
+
+
+def _shards(frame_count: int, workers: int):
+    size = max(MIN_SHARD_FRAMES, -(-frame_count // workers))
+    return [(start, min(start + size, frame_count)) for start in range(0, frame_count, size)]
+
+
+def _extract_range(path: str, start: int, stop: int, overlap: int) -> np.ndarray:
+    out = np.full((stop - start, 33, 4), np.nan, dtype=np.float32)
+    warm_start = max(0, start - overlap)
+    cap = cv2.VideoCapture(path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, warm_start)
+    with mp_pose.Pose(min_detection_confidence=0.5,
+                      min_tracking_confidence=0.5) as pose:
+        for idx in range(warm_start, stop):
+            ret, frame = cap.read()
+            if not ret:
+                break
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            if idx >= start and results.pose_landmarks:
+                out[idx - start] = [[p.x, p.y, p.z, p.visibility]
+                                    for p in results.pose_landmarks.landmark]
+    cap.release()
+    return out
+
+
+def extract_landmarks(path: str, executor: Executor | None = None,
+                      workers: int | None = None, overlap: int = OVERLAP_FRAMES):
+    frame_count, fps = _video_info(path)
+    workers = workers or os.cpu_count() or 1
+    shards = _shards(frame_count, workers)
+    if executor is None or len(shards) < 2:
+        parts = [_extract_range(path, start, stop, overlap) for start, stop in shards]
+    else:
+        futures = [executor.submit(_extract_range, path, start, stop, overlap)
+                   for start, stop in shards]
+        parts = [f.result() for f in futures]
+    landmarks = np.concatenate(parts) if parts else np.empty((0, 33, 4), dtype=np.float32)
+    return landmarks, fps
+
+
+def summarize(exercise: str, landmarks: np.ndarray, fps: float) -> dict:
+    detected = ~np.isnan(landmarks[:, 0, 0])
+    result = analyze_sequence(exercise, landmarks[detected])
+    mistakes = []
+    if result["reps"]:
+        # like the live engine, the set starts at the first counted rep
+        first = result["rep_frames"][0]
+        for row in decode_mistakes(result["codes"][first:], result["cues"]):
+            mistakes.extend(cue_texts(row))
+    return {
+        "exercise": exercise,
+        "reps": result["reps"],
+        "duration": len(landmarks) / fps if fps else 0.0,
+        "mistakes": mistakes,
+        "frames": len(landmarks),
+        "frames_with_pose": int(detected.sum()),
+    }
+
+
+def analyze_video(path: str, exercise: str = "squat", executor: Executor | None = None,
+                  workers: int | None = None) -> dict:
+    if exercise not in BATCH_ANALYZERS:
+        raise ValueError(f"Unknown exercise '{exercise}'")
+    landmarks, fps = extract_landmarks(path, executor=executor, workers=workers)
+    summary = summarize(exercise, landmarks, fps)
+    summary["source"] = os.path.basename(path)
+    return summary
+
+
+async def analyze_video_async(path: str, exercise: str, executor: Executor,
+                              workers: int | None = None) -> dict:
+    # same as analyze_video, but awaits the shards instead of blocking a thread on them
+    if exercise not in BATCH_ANALYZERS:
+        raise ValueError(f"Unknown exercise '{exercise}'")
+    loop = asyncio.get_running_loop()
+    frame_count, fps = await loop.run_in_executor(executor, _video_info, path)
+    shards = _shards(frame_count, workers or os.cpu_count() or 1)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(executor, _extract_range, path, start, stop, OVERLAP_FRAMES)
+        for start, stop in shards
+    ))
+    landmarks = np.concatenate(parts) if parts else np.empty((0, 33, 4), dtype=np.float32)
+    summary = await loop.run_in_executor(None, summarize, exercise, landmarks, fps)
+    summary["source"] = os.path.basename(path)
+    return summary
+
+
+def process_pool(workers: int | None = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze recorded workout videos.")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--exercise", default="squat", choices=sorted(BATCH_ANALYZERS))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    with process_pool(workers) as executor:
+        for path in args.videos:
+            summary = analyze_video(path, args.exercise, executor=executor, workers=workers)
+            print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import os
+import json
+from pathlib import Path
+
+# one file for the clip builder (scripts/cache_voice.py) and the API: a persona
+# added there can be selected and speaks feedback without code changes
+VOICES_CONFIG = Path(os.getenv("VOICES_CONFIG") or Path(__file__).resolve().parents[3] / "scripts" / "voices.json")
+DEFAULT_PERSONA = "default"
+
+
+def load_personas(path: Path = VOICES_CONFIG) -> dict:
+    # {persona: spec}, with each spec's "model" resolved against voice_dir (or PIPER_VOICE_DIR)
+    path = Path(path)
+    config = json.loads(path.read_text())
+    voice_dir = Path(os.getenv("PIPER_VOICE_DIR") or config.get("voice_dir", ".")).expanduser()
+    if not voice_dir.is_absolute():
+        voice_dir = path.resolve().parent / voice_dir
+    personas = {}
+    for persona, spec in config["personas"].items():
+        model = Path(spec["model"]).expanduser()
+        personas[persona] = {**spec, "model": model if model.is_absolute() else voice_dir / model}
+    if DEFAULT_PERSONA not in personas:
+        raise ValueError(f"{path} must define the '{DEFAULT_PERSONA}' persona")
+    return personas
+
+
+PERSONAS = load_personas()
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from collections import deque
+from functools import partial
+
+
+class LatestQueue:
+
+    def __init__(self, maxsize: int = 1, on_drop=None):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self._on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                if self._on_drop is not None:
+                    self._on_drop(self._items[0])
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float | None = None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class FramePipeline:
+
+    def __init__(self, source, stages, maxsize: int = 1, poll: float = 0.5, on_drop=None):
+        self._source = source
+        self._stages = stages
+        self._poll = poll
+        self._stop = threading.Event()
+        names = ["capture"] + [name for name, _ in stages]
+        self._queues = [LatestQueue(maxsize, partial(on_drop, name) if on_drop else None)
+                        for name in names]
+        self.timings = {name: {"ms": 0.0, "count": 0} for name in names}
+        self.latency_ms = 0.0
+        self._threads = [threading.Thread(target=self._run_source, daemon=True)]
+        for i, (name, fn) in enumerate(stages):
+            self._threads.append(threading.Thread(
+                target=self._run_stage, args=(name, fn, self._queues[i], self._queues[i + 1]),
+                daemon=True))
+
+    def _record(self, name: str, started: float):
+        stat = self.timings[name]
+        ms = (time.perf_counter() - started) * 1000.0
+        stat["ms"] = ms if not stat["count"] else 0.9 * stat["ms"] + 0.1 * ms
+        stat["count"] += 1
+
+    def _run_source(self):
+        out = self._queues[0]
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                item = self._source()
+                if item is None:
+                    break
+                self._record("capture", started)
+                out.put((started, item))
+        finally:
+            out.close()
+
+    def _run_stage(self, name, fn, inbox: LatestQueue, out: LatestQueue):
+        try:
+            while not self._stop.is_set():
+                try:
+                    packet = inbox.get(timeout=self._poll)
+                except queue.Empty:
+                    continue
+                if packet is None:
+                    break
+                captured_at, item = packet
+                started = time.perf_counter()
+                item = fn(item)
+                self._record(name, started)
+                if item is not None:
+                    out.put((captured_at, item))
+        finally:
+            out.close()
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        for q in self._queues:
+            q.close()
+        for thread in self._threads:
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def __iter__(self):
+        output = self._queues[-1]
+        while not self._stop.is_set():
+            try:
+                packet = output.get(timeout=self._poll)
+            except queue.Empty:
+                continue
+            if packet is None:
+                return
+            captured_at, item = packet
+            latency = (time.perf_counter() - captured_at) * 1000.0
+            self.latency_ms = latency if not self.latency_ms else 0.9 * self.latency_ms + 0.1 * latency
+            yield item
+
+    def stats(self) -> dict:
+        names = list(self.timings)
+        return {
+            "stages": {name: {"ms": round(self.timings[name]["ms"], 2),
+                              "count": self.timings[name]["count"],
+                              "dropped": self._queues[i].dropped}
+                       for i, name in enumerate(names)},
+            "latency_ms": round(self.latency_ms, 2),
+        }
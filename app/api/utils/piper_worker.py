@@ -0,0 +1,60 @@
+# Long-lived Piper synthesizer: loads one voice once, then answers JSON lines
+#   stdin:  {"text": "...", "output_file": "/path/out.wav"}
+#   stdout: {"ok": true, "output_file": "..."} | {"ok": false, "error": "..."}
+# Started and fed by app.api.utils.tts.PiperPool.
+import os
+import sys
+import json
+import wave
+import argparse
+
+
+def _synthesize(voice, text: str, out_path: str):
+    tmp_path = f"{out_path}.{os.getpid()}.part"
+    wav_file = wave.open(tmp_path, "wb")
+    try:
+        if hasattr(voice, "synthesize_wav"):
+            voice.synthesize_wav(text, wav_file)
+        else:
+            voice.synthesize(text, wav_file)
+        wav_file.close()
+    except Exception:
+        try:
+            wav_file.close()
+        except wave.Error:
+            pass
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, out_path)
+
+
+def _reply(message: dict):
+    sys.stdout.write(json.dumps(message) + "\n")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Piper synthesis over stdin/stdout.")
+    parser.add_argument("--model", required=True)
+    args = parser.parse_args()
+
+    from piper.voice import PiperVoice
+
+    voice = PiperVoice.load(args.model)
+    _reply({"ready": True, "model": args.model})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            out_dir = os.path.dirname(request["output_file"])
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+            _synthesize(voice, request["text"], request["output_file"])
+            _reply({"ok": True, "output_file": request["output_file"]})
+        except Exception as e:
+            _reply({"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+
+if __name__ == "__main__":
+    main()
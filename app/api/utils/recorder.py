@@ -0,0 +1,113 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.api.utils.history import NUM_LANDMARKS, LANDMARK_DIMS
+
+# unset: sessions are not recorded
+RECORD_DIR = os.getenv("RECORD_DIR")
+RECORD_CHUNK_FRAMES = int(os.getenv("RECORD_CHUNK_FRAMES", 1800))
+RECORD_MAX_CHUNKS = int(os.getenv("RECORD_MAX_CHUNKS", 60))
+
+FRAME_DTYPE = np.dtype([("t", "<f8"), ("landmarks", "<f4", (NUM_LANDMARKS, LANDMARK_DIMS))])
+MANIFEST = "recording.json"
+
+# one writer for every session keeps disk I/O off the frame threads without fanning out
+_writer = ThreadPoolExecutor(1, thread_name_prefix="recorder")
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+class SessionRecorder:
+    # Appends (clock time, landmarks) frames to a preallocated chunk. Full chunks are
+    # written as structured .npy files on the writer thread (np.load(..., mmap_mode="r")
+    # maps them back without a copy) and only the newest `max_chunks` are kept.
+    # Not thread-safe: callers hold the session lock.
+
+    def __init__(self, directory: str, session_id: str, chunk_frames: int = RECORD_CHUNK_FRAMES,
+                 max_chunks: int = RECORD_MAX_CHUNKS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_chunks = max_chunks
+        self.frames = 0
+        self._buffers = [np.empty(chunk_frames, dtype=FRAME_DTYPE) for _ in range(2)]
+        self._active = 0
+        self._fill = 0
+        self._chunk_index = 0
+        self._chunk = None
+        self._pending = None
+        self._manifest = {"version": 1, "session": session_id, "chunks": []}
+        _write_json(os.path.join(directory, MANIFEST), self._manifest)
+
+    def record(self, t: float, landmarks: np.ndarray, exercise: str):
+        if self._chunk is None:
+            self._chunk = {"first_frame": self.frames, "exercise": exercise, "events": []}
+        buf = self._buffers[self._active]
+        buf["t"][self._fill] = t
+        buf["landmarks"][self._fill] = landmarks
+        self._fill += 1
+        self.frames += 1
+        if self._fill == len(buf):
+            self._rotate()
+
+    def mark_exercise(self, t: float, exercise: str):
+        # explicit /set_config switches; gesture switches replay on their own. Always an
+        # event, even at a chunk boundary: a switch also resets state the replay must redo
+        if self._chunk is None:
+            self._chunk = {"first_frame": self.frames, "exercise": exercise, "events": []}
+        self._chunk["events"].append({"frame": self.frames, "t": t, "exercise": exercise})
+
+    def _rotate(self):
+        if self._pending is not None:
+            # at most one chunk in flight; a stalled disk slows this session, not memory
+            self._pending.result()
+        frames = self._buffers[self._active][:self._fill]
+        entry = {
+            **self._chunk,
+            "file": f"chunk-{self._chunk_index:06d}.npy",
+            "frames": self._fill,
+            "t0": float(frames["t"][0]),
+            "t1": float(frames["t"][-1]),
+        }
+        self._pending = _writer.submit(self._write_chunk, frames, entry)
+        self._active ^= 1
+        self._fill = 0
+        self._chunk = None
+        self._chunk_index += 1
+
+    def _write_chunk(self, frames: np.ndarray, entry: dict):
+        path = os.path.join(self.directory, entry["file"])
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, frames)
+        os.replace(path + ".tmp", path)
+        chunks = self._manifest["chunks"]
+        chunks.append(entry)
+        while len(chunks) > self.max_chunks:
+            dropped = chunks.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, dropped["file"]))
+            except FileNotFoundError:
+                pass
+        _write_json(os.path.join(self.directory, MANIFEST), self._manifest)
+
+    def close(self):
+        if self._fill:
+            self._rotate()
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+
+def load_recording(directory: str):
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    for entry in manifest["chunks"]:
+        frames = np.load(os.path.join(directory, entry["file"]), mmap_mode="r")
+        yield entry, frames
@@ -0,0 +1,68 @@
+import threading
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+from app.api.utils.landmarks import skeleton_specs, GREEN, ORANGE, RED, GRAY
+
+SKELETON_SPECS = {color: skeleton_specs(color) for color in (GREEN, ORANGE, RED, GRAY)}
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def cached_skeleton_specs(color_bgr):
+    specs = SKELETON_SPECS.get(color_bgr)
+    return specs if specs is not None else skeleton_specs(color_bgr)
+
+
+@lru_cache(maxsize=512)
+def text_patch(text: str, scale: float, color, thickness: int):
+    (w, h), baseline = cv2.getTextSize(text, FONT, scale, thickness)
+    pad = thickness
+    origin = (pad, h + pad)
+    alpha = np.zeros((h + baseline + 2 * pad, w + 2 * pad), dtype=np.uint8)
+    cv2.putText(alpha, text, origin, FONT, scale, 255, thickness)
+    alpha = alpha.astype(np.uint16)[..., None]
+    premultiplied = alpha * np.array(color, dtype=np.uint16)
+    return 255 - alpha, premultiplied, origin
+
+
+def put_text(image, text: str, org, scale: float, color, thickness: int = 2):
+    inverse, premultiplied, (ox, oy) = text_patch(text, scale, tuple(color), thickness)
+    x0, y0 = org[0] - ox, org[1] - oy
+    ih, iw = image.shape[:2]
+    ph, pw = inverse.shape[:2]
+    px0, py0 = max(0, -x0), max(0, -y0)
+    x1, y1 = min(iw, x0 + pw), min(ih, y0 + ph)
+    x0, y0 = max(0, x0), max(0, y0)
+    if x1 <= x0 or y1 <= y0:
+        return
+    px1, py1 = px0 + (x1 - x0), py0 + (y1 - y0)
+    roi = image[y0:y1, x0:x1]
+    roi[...] = (roi * inverse[py0:py1, px0:px1] + premultiplied[py0:py1, px0:px1]) // 255
+
+
+class FramePool:
+
+    def __init__(self, max_free: int = 4):
+        self._free = []
+        self._lock = threading.Lock()
+        self.max_free = max_free
+        self.allocated = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        with self._lock:
+            while self._free:
+                buf = self._free.pop()
+                if buf.shape == tuple(shape) and buf.dtype == dtype:
+                    return buf
+        self.allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, buf):
+        if buf is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free:
+                self._free.append(buf)
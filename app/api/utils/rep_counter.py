@@ -1,4 +1,4 @@
-from collections import deque
+import numpy as np
 
 class RepCounter:
 
@@ -31,3 +31,19 @@ class RepCounter:
                 self._was_good_phase = False
 
         return self.count
+
+
+def rep_boundaries(good, good_min_frames: int = 5, bad_min_frames: int = 2) -> np.ndarray:
+    good = np.asarray(good, dtype=bool)
+    if not len(good):
+        return np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], good[1:] != good[:-1])))
+    lengths = np.diff(np.append(starts, len(good)))
+    values = good[starts]
+    good_runs = values & (lengths >= good_min_frames)
+    bad_runs = ~values & (lengths >= bad_min_frames)
+    # a long-enough bad run counts a rep only if a long-enough good run
+    # happened since the previous long-enough bad run
+    good_seen = np.cumsum(good_runs)[bad_runs]
+    counted = good_seen > np.concatenate(([0], good_seen[:-1]))
+    return starts[bad_runs][counted] + bad_min_frames - 1
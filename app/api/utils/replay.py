@@ -0,0 +1,86 @@
+import json
+import time
+import argparse
+from collections import Counter
+
+from app.api.utils.session import PoseSession
+from app.api.utils.engine import process_landmarks, set_config_handler, _set_active_exercise
+from app.api.utils.recorder import load_recording
+
+
+class ReplayClock:
+    # stands in for time.monotonic: reads back the recorded timestamp of the current frame
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def replay(directory: str, exercise: str | None = None, session: PoseSession | None = None) -> dict:
+    # Feeds a recording through the live engine (gestures, RepCounter, set end) as fast as
+    # the CPU allows. The session never opens a camera and nothing is pushed to clients.
+    clock = ReplayClock()
+    session = session or PoseSession("replay")
+    session.clock = clock
+    session.feedback_enabled = False
+    reps, cues = [], Counter()
+    frames = 0
+    first_t = last_t = None
+    started = time.perf_counter()
+    for entry, chunk in load_recording(directory):
+        # later chunks check the exercise they were recorded in against the replay's,
+        # unless the caller overrode it
+        resync = first_t is not None and exercise is None
+        if first_t is None:
+            clock.now = float(chunk["t"][0])
+            _set_active_exercise(session, exercise or entry["exercise"])
+            first_t = clock.now
+        events = iter(entry["events"])
+        event = next(events, None)
+        for i, (t, landmarks) in enumerate(zip(chunk["t"], chunk["landmarks"])):
+            frame = entry["first_frame"] + i
+            while event is not None and event["frame"] <= frame:
+                clock.now = event["t"]
+                set_config_handler(session, event["exercise"])
+                event = next(events, None)
+            if resync and i == 0 and session.exercise != entry["exercise"]:
+                # recordings made before boundary switches were written as events
+                clock.now = float(t)
+                set_config_handler(session, entry["exercise"])
+            clock.now = last_t = float(t)
+            seen = session.last_rep_seen
+            result = process_landmarks(session, landmarks)
+            cues.update(result["mistakes"])
+            if session.last_rep_seen > seen:
+                reps.append({"frame": frame, "t": round(clock.now - first_t, 3),
+                             "exercise": result["exercise"], "reps": session.last_rep_seen})
+            frames += 1
+    elapsed = time.perf_counter() - started
+    recorded = (last_t - first_t) if frames else 0.0
+    return {
+        "recording": directory,
+        "frames": frames,
+        "recorded_seconds": round(recorded, 2),
+        "replay_seconds": round(elapsed, 3),
+        "speedup": round(recorded / elapsed, 1) if elapsed and recorded else None,
+        "sets": [{**w, "duration": round(w["duration"], 3)}
+                 for w in session.workouts_buffer if w["exercise"] != "rest"],
+        "rests": [round(w["duration"], 3) for w in session.workouts_buffer if w["exercise"] == "rest"],
+        "reps": reps,
+        "cue_frames": dict(cues.most_common()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded landmark streams through the engine.")
+    parser.add_argument("recordings", nargs="+", help="directories containing recording.json")
+    parser.add_argument("--exercise", default=None, help="override the exercise the recording starts in")
+    args = parser.parse_args()
+    for directory in args.recordings:
+        print(json.dumps(replay(directory, args.exercise)))
+
+
+if __name__ == "__main__":
+    main()
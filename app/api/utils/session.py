@@ -0,0 +1,214 @@
+import os
+import re
+import time
+import threading
+from typing import Dict, List
+
+import cv2
+import mediapipe as mp
+from fastapi import Header, HTTPException, Query
+
+from app.api.utils.auth import bearer_token, decode_access_token
+from app.api.utils.rep_counter import RepCounter
+from app.api.utils.gestures import GestureSwitch
+from app.api.utils.render import FramePool
+from app.api.utils.metrics import ACTIVE_SESSIONS
+from app.api.utils.events import EventChannel
+from app.api.utils.history import SessionHistory
+from app.api.utils.recorder import SessionRecorder, RECORD_DIR
+from app.api.utils.landmarks import angle_between, ema_update
+from app.api.exercise_modules import EXERCISES, DEFAULT_EXERCISE
+
+mp_pose = mp.solutions.pose
+
+DEFAULT_SESSION_ID = "default"
+CAPTURE_SOURCE = int(os.getenv("CAPTURE_SOURCE", 0))
+FRAME_WIDTH = 1280
+FRAME_HEIGHT = 720
+# sessions with no stream, socket or event subscriber and no request for this long are dropped
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", 3600))
+
+
+class PoseSession:
+
+    def __init__(self, session_id: str, source=CAPTURE_SOURCE):
+        self.session_id = session_id
+        self.source = source
+        # every engine timestamp comes from here so a replay can substitute recorded times
+        self.clock = time.monotonic
+        self.recorder: SessionRecorder | None = None
+        self.cap = None
+        self.pose = None
+        self._viewers = 0
+        self._owns_recording = False
+        self.sockets = 0
+        self.last_seen = time.monotonic()
+        self.lock = threading.RLock()
+        self.capture_lock = threading.Lock()
+        self.pipeline = None
+        self.encoder = None
+        self.frame_pool = FramePool()
+        self.frame_shape = None
+        self.rgb_buffer = None
+
+        self.history = SessionHistory()
+        self.load_exercise(DEFAULT_EXERCISE)
+        self.rep_counter = RepCounter(good_min_frames=5, bad_min_frames=2)
+        self.gesture_switch = GestureSwitch(hand_raise_frames=10, plank_frames=10, cooldown_frames=30)
+
+        self.current_cues: List[str] = []
+        self.persona: str = "default"
+        self.current_user: str | None = None
+
+        self.last_tts_at: float = 0.0
+        self.last_tts_per_key: Dict[str, float] = {}
+        self.last_rep_seen: int = 0
+        self.last_rep_spoken: int = 0
+        self.pending_rep: int | None = None
+        self.last_rep_announced_at: float = 0.0
+        self.last_rep_frozen: int = 0
+        self.rep_freeze_until: float = 0.0
+
+        self.set_active: bool = False
+        self.set_start_time: float = 0.0
+        self.set_end_time: float = 0.0
+        self.set_mistakes: List[str] = []
+        self.last_set_summary: dict | None = None
+        self.last_rest_summary: dict | None = None
+        self.rest_start_time: float = 0.0
+
+        # off for replays, which must not queue LLM/TTS jobs for recorded sets
+        self.feedback_enabled: bool = True
+        self.feedback_ready: bool = False
+        self.feedback_seq: int = 0
+        self.feedback_job_id: str | None = None
+        self.last_feedback: dict | None = None
+
+        self.workouts_buffer: List[dict] = []
+        self.events = EventChannel()
+
+    def load_exercise(self, name: str):
+        # resolved once per switch so the per-frame path is a single call, not a lookup
+        exercise = EXERCISES.get(name) or EXERCISES[DEFAULT_EXERCISE]
+        self.exercise = exercise.name
+        self.analyzer = exercise.analyze
+        self.thresholds, self.smoothed = exercise.config(angle_between, ema_update)
+        self.history.configure(exercise.features)
+
+    @property
+    def streaming(self) -> bool:
+        return self._viewers > 0
+
+    @property
+    def in_use(self) -> bool:
+        return self._viewers > 0 or self.sockets > 0 or self.events.active
+
+    def open(self):
+        with self.lock:
+            self._viewers += 1
+            if self.cap is None:
+                self.cap = cv2.VideoCapture(self.source)
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+            if self.pose is None:
+                self.pose = mp_pose.Pose(min_detection_confidence=0.5,
+                                         min_tracking_confidence=0.5)
+            if self._viewers == 1:
+                self._owns_recording = self.start_recording()
+
+    def close(self, force: bool = False):
+        with self.lock:
+            self._viewers = 0 if force else max(0, self._viewers - 1)
+            if self._viewers:
+                return
+            if force or self._owns_recording:
+                self.stop_recording()
+                self._owns_recording = False
+            if self.cap is not None:
+                with self.capture_lock:
+                    self.cap.release()
+                    self.cap = None
+            if self.pose is not None:
+                self.pose.close()
+                self.pose = None
+
+    def start_recording(self) -> bool:
+        # True if this call started a recording, so the caller knows to stop it
+        if not RECORD_DIR:
+            return False
+        with self.lock:
+            if self.recorder is not None:
+                return False
+            name = re.sub(r"[^\w.-]", "_", self.session_id)
+            directory = os.path.join(RECORD_DIR, name, time.strftime("%Y%m%d-%H%M%S"))
+            self.recorder = SessionRecorder(directory, self.session_id)
+            return True
+
+    def stop_recording(self):
+        with self.lock:
+            recorder, self.recorder = self.recorder, None
+            if recorder is not None:
+                recorder.close()
+
+
+_SESSIONS: Dict[str, PoseSession] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def get_session(session_id: str | None = None) -> PoseSession:
+    session_id = session_id or DEFAULT_SESSION_ID
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(session_id)
+        if session is None:
+            session = PoseSession(session_id)
+            _SESSIONS[session_id] = session
+        session.last_seen = time.monotonic()
+        return session
+
+
+def find_session(session_id: str) -> PoseSession | None:
+    with _SESSIONS_LOCK:
+        return _SESSIONS.get(session_id)
+
+
+def drop_session(session_id: str):
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.pop(session_id, None)
+    if session is not None:
+        session.close(force=True)
+
+
+def drop_idle_sessions(max_idle: float = SESSION_IDLE_SECONDS) -> List[PoseSession]:
+    cutoff = time.monotonic() - max_idle
+    with _SESSIONS_LOCK:
+        idle = [s for s in _SESSIONS.values() if not s.in_use and s.last_seen < cutoff]
+        for session in idle:
+            del _SESSIONS[session.session_id]
+    for session in idle:
+        session.close(force=True)
+    return idle
+
+
+def active_sessions() -> List[PoseSession]:
+    with _SESSIONS_LOCK:
+        return list(_SESSIONS.values())
+
+
+ACTIVE_SESSIONS.set_function(lambda: sum(1 for s in active_sessions() if s.streaming))
+
+
+def session_id_from_token(token: str | None) -> str:
+    # only anonymous callers share the default session; a bad token is an error,
+    # not a way back into it
+    if not token:
+        return DEFAULT_SESSION_ID
+    username = (decode_access_token(token) or {}).get("username")
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return username
+
+
+def current_session(Authorization: str = Header(None),
+                    token: str | None = Query(None)) -> PoseSession:
+    token = bearer_token(Authorization) or token
+    return get_session(session_id_from_token(token))
@@ -0,0 +1,99 @@
+import time
+
+import cv2
+
+PART_HEADER = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+PART_FOOTER = b"\r\n"
+
+DEFAULT_QUALITY = 80
+DEFAULT_FPS = 30.0
+
+# (scale, quality) multipliers applied on top of the requested settings,
+# walked down when the client can't keep up and back up when it can
+ADAPTIVE_LADDER = (
+    (1.0, 1.0),
+    (1.0, 0.8),
+    (0.75, 0.8),
+    (0.75, 0.6),
+    (0.5, 0.6),
+    (0.5, 0.5),
+)
+DEGRADE_AFTER_FRAMES = 15
+UPGRADE_AFTER_FRAMES = 60
+
+
+class MJPEGEncoder:
+
+    def __init__(self, width: int | None = None, quality: int = DEFAULT_QUALITY,
+                 max_fps: float | None = None, adaptive: bool = False):
+        self.width = width
+        self.quality = max(10, min(100, quality))
+        self.max_fps = max_fps
+        self.adaptive = adaptive
+        self.level = 0
+        self.send_ms = 0.0
+        self.skipped = 0
+        self._frames_at_level = 0
+        self._last_encoded = 0.0
+        self._resized = None
+
+    def _budget(self) -> float:
+        return 1.0 / (self.max_fps or DEFAULT_FPS)
+
+    def skip_frame(self) -> bool:
+        now = time.perf_counter()
+        interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        if self.adaptive:
+            interval = max(interval, self.send_ms / 1000.0)
+        if now - self._last_encoded < interval:
+            self.skipped += 1
+            return True
+        self._last_encoded = now
+        return False
+
+    def _resize(self, image):
+        scale = ADAPTIVE_LADDER[self.level][0]
+        h, w = image.shape[:2]
+        target_w = int(min(self.width or w, w) * scale)
+        if target_w >= w:
+            return image
+        target = (target_w, max(1, int(h * target_w / w)))
+        if self._resized is not None and self._resized.shape[1::-1] != target:
+            self._resized = None
+        self._resized = cv2.resize(image, target, dst=self._resized,
+                                   interpolation=cv2.INTER_AREA)
+        return self._resized
+
+    def encode(self, image) -> bytes | None:
+        quality = int(self.quality * ADAPTIVE_LADDER[self.level][1])
+        ok, buffer = cv2.imencode(".jpg", self._resize(image),
+                                  [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return None
+        return b"".join((PART_HEADER, buffer, PART_FOOTER))
+
+    def record_sent(self, seconds: float):
+        ms = seconds * 1000.0
+        self.send_ms = ms if not self.send_ms else 0.8 * self.send_ms + 0.2 * ms
+        if not self.adaptive:
+            return
+        self._frames_at_level += 1
+        budget_ms = self._budget() * 1000.0
+        if (self.send_ms > budget_ms and self._frames_at_level >= DEGRADE_AFTER_FRAMES
+                and self.level < len(ADAPTIVE_LADDER) - 1):
+            self.level += 1
+            self._frames_at_level = 0
+        elif (self.send_ms < 0.5 * budget_ms and self._frames_at_level >= UPGRADE_AFTER_FRAMES
+                and self.level > 0):
+            self.level -= 1
+            self._frames_at_level = 0
+
+    def stats(self) -> dict:
+        scale, quality = ADAPTIVE_LADDER[self.level]
+        return {
+            "level": self.level,
+            "scale": scale,
+            "quality": int(self.quality * quality),
+            "send_ms": round(self.send_ms, 2),
+            "skipped": self.skipped,
+        }
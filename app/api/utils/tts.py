@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import queue
+import hashlib
+import atexit
+import shutil
+import logging
+import threading
+import subprocess
+from pathlib import Path
+
+from app.api.utils.log import log_event
+from app.api.utils.metrics import TTS_CACHE_LOOKUPS
+
+PIPER_BIN = os.getenv("PIPER_BIN", "piper-tts")
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+OPUS_BITRATE = "32k"
+START_TIMEOUT = 60.0
+SYNTH_TIMEOUT = 30.0
+
+
+class PiperUnavailable(RuntimeError):
+    pass
+
+
+class PiperWorker:
+    # One warm piper_worker process for a single voice model; requests are
+    # serialised on the pipe, callers queue on the lock.
+
+    def __init__(self, model_path: Path):
+        self.model_path = Path(model_path)
+        self._proc = None
+        self._replies = None
+        self._lock = threading.Lock()
+        self.served = 0
+        self.restarts = 0
+
+    def _command(self):
+        return [sys.executable, "-m", "app.api.utils.piper_worker", "--model", str(self.model_path)]
+
+    def _read_replies(self, proc, replies: queue.Queue):
+        for line in proc.stdout:
+            try:
+                replies.put(json.loads(line))
+            except ValueError:
+                continue
+        replies.put(None)
+
+    def _start(self):
+        repo_root = Path(__file__).resolve().parents[3]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(repo_root), os.getenv("PYTHONPATH")]))}
+        self._proc = subprocess.Popen(self._command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      text=True, bufsize=1, env=env)
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_replies, args=(self._proc, self._replies), daemon=True).start()
+        ready = self._next_reply(START_TIMEOUT)
+        if not ready or not ready.get("ready"):
+            self._stop()
+            raise PiperUnavailable(f"piper worker failed to start for {self.model_path.name}")
+        log_event("piper_worker_started", model=self.model_path.name, pid=self._proc.pid)
+
+    def _next_reply(self, timeout: float):
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _stop(self):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+    def synthesize(self, text: str, out_path: Path, timeout: float = SYNTH_TIMEOUT) -> Path:
+        request = json.dumps({"text": text, "output_file": str(out_path)}) + "\n"
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                if self._proc is not None:
+                    self.restarts += 1
+                self._start()
+            try:
+                self._proc.stdin.write(request)
+                self._proc.stdin.flush()
+            except OSError:
+                self._stop()
+                raise RuntimeError(f"piper worker for {self.model_path.name} died")
+            reply = self._next_reply(timeout)
+            if reply is None:
+                # hung or exited mid-request; the next call starts a fresh process
+                self._stop()
+                raise RuntimeError(f"piper worker for {self.model_path.name} did not answer")
+            if not reply.get("ok"):
+                raise RuntimeError(reply.get("error") or "piper synthesis failed")
+            self.served += 1
+            return Path(reply["output_file"])
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+class PiperPool:
+
+    def __init__(self):
+        self._workers = {}
+        self._broken = set()
+        self._lock = threading.Lock()
+
+    def _worker(self, model_path: Path) -> PiperWorker:
+        key = str(Path(model_path).resolve())
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                worker = self._workers[key] = PiperWorker(Path(key))
+            return worker
+
+    def synthesize(self, model_path: Path, text: str, out_path: Path) -> Path:
+        model_path = Path(model_path)
+        if not model_path.exists():
+            raise FileNotFoundError(f"Missing model {model_path}")
+        if str(model_path) not in self._broken:
+            try:
+                return self._worker(model_path).synthesize(text, out_path)
+            except PiperUnavailable as e:
+                # e.g. the piper Python package isn't importable; fall back to the CLI for this voice
+                log_event("piper_worker_unavailable", logging.WARNING, model=model_path.name, error=str(e))
+                self._broken.add(str(model_path))
+        return synthesize_once(model_path, text, out_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {Path(key).name: {"served": w.served, "restarts": w.restarts,
+                                     "running": w._proc is not None and w._proc.poll() is None}
+                    for key, w in self._workers.items()}
+
+    def close(self):
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+
+def synthesize_once(model_path: Path, text: str, out_path: Path) -> Path:
+    piper_bin = shutil.which(PIPER_BIN)
+    if not piper_bin:
+        raise RuntimeError(f"{PIPER_BIN} not found")
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run([piper_bin, "--model", str(model_path), "--output_file", str(out_path)],
+                   input=text.encode("utf-8"), check=True)
+    return Path(out_path)
+
+
+PIPER_POOL = PiperPool()
+atexit.register(PIPER_POOL.close)
+
+
+CACHE_SUFFIXES = (".ogg", ".wav")
+
+
+class TTSCache:
+    # Content-addressed synthesis cache: one file per (voice, text), Opus/OGG when
+    # ffmpeg is available, WAV otherwise. Eviction is LRU by mtime (hits touch the
+    # file) with a size cap and a max age. Only finished cache files are evicted:
+    # .part temp files and clips whose key is still being synthesised are skipped.
+
+    def __init__(self, directory: Path, pool: PiperPool, max_bytes: int, max_age: float):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._ffmpeg = shutil.which(FFMPEG_BIN)
+
+    @staticmethod
+    def key(model_path: Path, text: str) -> str:
+        return hashlib.sha256(f"{Path(model_path).name}\0{text}".encode("utf-8")).hexdigest()[:24]
+
+    def _cached(self, key: str) -> Path | None:
+        for suffix in CACHE_SUFFIXES:
+            path = self.directory / f"tts_{key}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _compress(self, wav_path: Path, key: str) -> Path:
+        if not self._ffmpeg:
+            return wav_path
+        ogg_path = self.directory / f"tts_{key}.ogg"
+        part = ogg_path.with_name(ogg_path.name + ".part")
+        try:
+            subprocess.run([self._ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", str(wav_path),
+                            "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-f", "ogg", str(part)],
+                           check=True, timeout=30)
+        except (OSError, subprocess.SubprocessError) as e:
+            log_event("tts_compress_failed", logging.WARNING, error=str(e))
+            part.unlink(missing_ok=True)
+            return wav_path
+        os.replace(part, ogg_path)
+        wav_path.unlink(missing_ok=True)
+        return ogg_path
+
+    def get(self, model_path: Path, text: str) -> Path:
+        key = self.key(model_path, text)
+        try:
+            with self._key_lock(key):
+                path = self._cached(key)
+                if path is not None:
+                    TTS_CACHE_LOOKUPS.inc(result="hit")
+                    os.utime(path)
+                    return path
+                TTS_CACHE_LOOKUPS.inc(result="miss")
+                wav_path = self.directory / f"tts_{key}.wav"
+                self.pool.synthesize(model_path, text, wav_path)
+                path = self._compress(wav_path, key)
+        finally:
+            # hits and failed syntheses too, or evict() would skip the key forever
+            with self._lock:
+                self._key_locks.pop(key, None)
+        self.evict()
+        return path
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        with self._lock:
+            busy = set(self._key_locks)
+        for path in self.directory.iterdir():
+            if path.suffix not in CACHE_SUFFIXES or path.stem.removeprefix("tts_") in busy:
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            log_event("tts_cache_evicted", files=removed, bytes_left=total)
@@ -0,0 +1,54 @@
+import os
+
+from fastapi import Header, HTTPException
+
+from app.api.utils.db import users_collection
+from app.api.utils.auth import bearer_token, decode_access_token
+from app.api.utils.ttl_cache import TTLCache
+from app.api.utils.metrics import AUTH_CACHE_LOOKUPS
+from app.api.utils.session import find_session
+
+USER_CACHE_SECONDS = float(os.getenv("USER_CACHE_SECONDS", 60))
+# what authenticated routes need to know about the caller; never the password hash
+PRINCIPAL_FIELDS = {"_id": 0, "username": 1, "email": 1, "persona": 1}
+
+_principals = TTLCache(max_entries=4096, ttl=USER_CACHE_SECONDS)
+
+
+async def load_principal(username: str) -> dict | None:
+    user = _principals.get(username)
+    if user is not None:
+        AUTH_CACHE_LOOKUPS.inc(cache="user", result="hit")
+        return dict(user)
+    AUTH_CACHE_LOOKUPS.inc(cache="user", result="miss")
+    user = await users_collection.find_one({"username": username}, PRINCIPAL_FIELDS)
+    if user is not None:
+        _principals.set(username, dict(user))
+    return user
+
+
+def invalidate_user(username: str):
+    # call after any write to the fields in PRINCIPAL_FIELDS
+    _principals.pop(username)
+
+
+async def get_current_user(Authorization: str = Header(None)) -> dict:
+    token = bearer_token(Authorization)
+    if token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    username = payload.get("username")
+    user = await load_principal(username) if username else None
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    session = find_session(username)
+    if session is not None and session.current_user is None:
+        # a session recreated after idle eviction starts with the default persona
+        session.persona = user.get("persona", "default")
+        session.current_user = username
+    return user
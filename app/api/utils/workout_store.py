@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
+
+from app.api.utils.db import workouts_collection
+from app.api.exercise_modules.registry import REST
+from app.api.utils.log import log_event
+
+BATCH_SIZE = int(os.getenv("WORKOUT_BATCH_SIZE", 100))
+FLUSH_SECONDS = float(os.getenv("WORKOUT_FLUSH_SECONDS", 1.0))
+# while the database is unreachable nothing drains; past this, saves are turned away
+MAX_PENDING = int(os.getenv("WORKOUT_MAX_PENDING", 10000))
+DUPLICATE_KEY = 11000
+
+
+class WorkoutBufferFull(RuntimeError):
+    pass
+
+
+class WorkoutWriter:
+    # Write-behind buffer for workout documents. add() returns immediately; a
+    # background task bulk-inserts whatever is waiting every `interval` seconds,
+    # or as soon as `batch_size` documents have queued up.
+
+    def __init__(self, collection, batch_size: int = BATCH_SIZE, interval: float = FLUSH_SECONDS,
+                 max_pending: int = MAX_PENDING):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._wakeup = asyncio.Event()
+        self._flushing = asyncio.Lock()
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, username: str, workouts: list[dict]):
+        # must be called on the event loop
+        if len(self._pending) + len(workouts) > self.max_pending:
+            log_event("workout_buffer_full", logging.WARNING, username=username,
+                      pending=len(self._pending), rejected=len(workouts))
+            raise WorkoutBufferFull("Workout storage is unavailable, retry shortly")
+        self._pending.extend({**w, "username": username} for w in workouts)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _insert(self, batch: list[dict]):
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # a retried batch keeps the _ids pymongo assigned on the first attempt,
+            # so documents that already made it in show up as duplicates
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+
+    async def flush(self) -> int:
+        saved = 0
+        async with self._flushing:
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                try:
+                    await self._insert(batch)
+                except Exception as e:
+                    log_event("workout_flush_failed", logging.WARNING, error=str(e), pending=len(self._pending))
+                    break
+                del self._pending[:len(batch)]
+                saved += len(batch)
+        return saved
+
+    async def flush_user(self, username: str) -> int:
+        # read-your-writes for one caller; with nothing of theirs queued there is
+        # no lock and no I/O, so reads don't wait behind other users' batches
+        if not any(d["username"] == username for d in self._pending):
+            return 0
+        async with self._flushing:
+            mine = [d for d in self._pending if d["username"] == username]
+            if not mine:
+                return 0
+            try:
+                await self._insert(mine)
+            except Exception as e:
+                log_event("workout_flush_failed", logging.WARNING, error=str(e), pending=len(self._pending))
+                return 0
+            saved = {id(d) for d in mine}
+            self._pending = [d for d in self._pending if id(d) not in saved]
+        return len(mine)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+WORKOUT_WRITER = WorkoutWriter(workouts_collection)
+
+
+PAGE_SIZE = 50
+WORKOUT_FIELDS = ("exercise", "reps", "duration", "persona", "mistakes", "created_at", "ended_at")
+WEEK_SECONDS = 7 * 86400
+# the Unix epoch fell on a Thursday; shifting by three days puts week starts on Mondays
+WEEK_OFFSET = 3 * 86400
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["created_at"], str(doc["_id"]), isinstance(doc["_id"], ObjectId)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, doc_id, is_oid = json.loads(raw)
+        return float(created_at), ObjectId(doc_id) if is_oid else doc_id
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor")
+
+
+async def list_workouts(username: str, limit: int = PAGE_SIZE, cursor: str | None = None,
+                        fields=None, since: float | None = None, until: float | None = None) -> dict:
+    # newest first, keyset-paginated on (created_at, _id) so every page is an index range scan
+    query = {"username": username}
+    if since is not None or until is not None:
+        query["created_at"] = {k: v for k, v in (("$gte", since), ("$lt", until)) if v is not None}
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}},
+        ]}]}
+    projection = {f: 1 for f in (fields or WORKOUT_FIELDS) if f in WORKOUT_FIELDS}
+    projection["created_at"] = 1
+    docs = await workouts_collection.find(query, projection) \
+        .sort([("created_at", -1), ("_id", -1)]).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {
+        "workouts": [{k: v for k, v in d.items() if k != "_id"} for d in docs[:limit]],
+        "next_cursor": next_cursor,
+    }
+
+
+async def workout_stats(username: str, weeks: int = 12) -> dict:
+    # rest periods are stored as workouts but are not sets
+    sets = {"username": username, "exercise": {"$ne": REST}}
+    match = {"$match": sets}
+    since = time.time() - weeks * WEEK_SECONDS
+    per_exercise, per_week, durations, mistakes = await asyncio.gather(
+        workouts_collection.aggregate([
+            match,
+            {"$group": {"_id": "$exercise", "sets": {"$sum": 1}, "reps": {"$sum": "$reps"},
+                        "duration": {"$sum": "$duration"}, "avg_duration": {"$avg": "$duration"}}},
+            {"$sort": {"_id": 1}},
+        ]).to_list(length=None),
+        workouts_collection.aggregate([
+            {"$match": {**sets, "created_at": {"$gte": since}}},
+            {"$group": {
+                "_id": {"$subtract": ["$created_at", {"$mod": [{"$add": ["$created_at", WEEK_OFFSET]}, WEEK_SECONDS]}]},
+                "reps": {"$sum": "$reps"},
+                "sets": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+        ]).to_list(length=None),
+        workouts_collection.aggregate([
+            match,
+            {"$group": {"_id": None, "avg_duration": {"$avg": "$duration"}}},
+        ]).to_list(length=None),
+        workouts_collection.aggregate([
+            match,
+            {"$unwind": "$mistakes"},
+            {"$group": {"_id": "$mistakes.cue", "count": {"$sum": "$mistakes.count"}}},
+            {"$sort": {"count": -1, "_id": 1}},
+            {"$limit": 5},
+        ]).to_list(length=None),
+    )
+    return {
+        "exercises": {
+            row["_id"]: {
+                "sets": row["sets"],
+                "reps": row["reps"],
+                "duration": round(row["duration"] or 0.0, 1),
+                "avg_duration": round(row["avg_duration"] or 0.0, 1),
+            }
+            for row in per_exercise if row["_id"]
+        },
+        "weeks": [
+            {"week_start": datetime.fromtimestamp(row["_id"], timezone.utc).strftime("%Y-%m-%d"),
+             "reps": row["reps"], "sets": row["sets"]}
+            for row in per_week
+        ],
+        "avg_set_duration": round(durations[0]["avg_duration"] or 0.0, 1) if durations else 0.0,
+        "top_mistakes": [{"cue": row["_id"], "count": row["count"]} for row in mistakes],
+    }
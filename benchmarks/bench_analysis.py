@@ -0,0 +1,198 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+
+import numpy as np
+
+from app.api.utils.landmarks import normalize_landmarks, angle_between, ema_update
+from app.api.utils.gestures import GestureSwitch
+from app.api.utils.rep_counter import RepCounter
+from app.api.utils.batch import analyze_sequence
+from app.api.utils.engine import process_landmarks, _set_active_exercise
+from app.api.utils.session import PoseSession
+from app.api.utils.history import SessionHistory
+from app.api.exercise_modules.squat import get_squat_config, analyze_squat, SQUAT_FEATURES
+from app.api.exercise_modules.pushup import get_pushup_config, analyze_pushup, PUSHUP_FEATURES
+from app.api.exercise_modules import GESTURES
+from benchmarks.fixtures import SYNTHETIC, load_recorded
+
+WARMUP_FRAMES = 50
+
+
+def _time_calls(fn, items) -> np.ndarray:
+    timings = np.empty(len(items), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i, item in enumerate(items):
+        started = clock()
+        fn(item)
+        timings[i] = clock() - started
+    return timings
+
+
+def bench_normalize(seq):
+    return _time_calls(normalize_landmarks, seq)
+
+
+def bench_analyze_squat(seq):
+    thresholds, smoothed = get_squat_config(angle_between, ema_update)
+    history = SessionHistory()
+    history.configure(SQUAT_FEATURES)
+    norms = [normalize_landmarks(d) for d in seq]
+    return _time_calls(lambda i: analyze_squat(norms[i], smoothed, history, thresholds, seq[i]),
+                       range(len(seq)))
+
+
+def bench_analyze_pushup(seq):
+    thresholds, smoothed = get_pushup_config(angle_between, ema_update)
+    history = SessionHistory()
+    history.configure(PUSHUP_FEATURES)
+    norms = [normalize_landmarks(d) for d in seq]
+    return _time_calls(lambda i: analyze_pushup(norms[i], smoothed, history, thresholds, seq[i]),
+                       range(len(seq)))
+
+
+def bench_gesture_detect(seq):
+    switch = GestureSwitch(hand_raise_frames=10, plank_frames=10, cooldown_frames=30)
+    norms = [normalize_landmarks(d) for d in seq]
+    return _time_calls(lambda norm: switch.detect(norm, "rest", GESTURES), norms)
+
+
+def bench_end_set_detect(seq):
+    switch = GestureSwitch(hand_raise_frames=10, plank_frames=10, cooldown_frames=30)
+    norms = [normalize_landmarks(d) for d in seq]
+    return _time_calls(lambda norm: switch.end_set_detect(norm, frames_required=12), norms)
+
+
+def bench_rep_counter(seq, exercise):
+    counter = RepCounter(good_min_frames=5, bad_min_frames=2)
+    good = analyze_sequence(exercise, seq)["good"].tolist()
+    return _time_calls(counter.update, good)
+
+
+def bench_end_to_end(seq, exercise):
+    session = PoseSession("bench")
+    _set_active_exercise(session, exercise)
+    return _time_calls(lambda data: process_landmarks(session, data), seq)
+
+
+def _exercise_for(name: str) -> str:
+    for exercise in ("squat", "pushup"):
+        if name.startswith(exercise):
+            return exercise
+    return "rest"
+
+
+def targets_for(name: str):
+    exercise = _exercise_for(name)
+    targets = {
+        "normalize_landmarks": bench_normalize,
+        "GestureSwitch.detect": bench_gesture_detect,
+        "GestureSwitch.end_set_detect": bench_end_set_detect,
+    }
+    if exercise == "squat":
+        targets["analyze_squat"] = bench_analyze_squat
+    if exercise == "pushup":
+        targets["analyze_pushup"] = bench_analyze_pushup
+    if exercise != "rest":
+        targets["RepCounter.update"] = lambda seq: bench_rep_counter(seq, exercise)
+    targets["end_to_end"] = lambda seq: bench_end_to_end(seq, exercise)
+    return targets
+
+
+def summarize(timings: np.ndarray) -> dict:
+    us = timings / 1000.0
+    return {
+        "frames": int(len(us)),
+        "fps": round(float(len(us) / (us.sum() / 1e6)), 1) if us.sum() else None,
+        "mean_us": round(float(us.mean()), 2),
+        "p50_us": round(float(np.percentile(us, 50)), 2),
+        "p99_us": round(float(np.percentile(us, 99)), 2),
+    }
+
+
+def run(fixtures: dict, repeat: int = 3, only=None) -> dict:
+    results = {}
+    for name, seq in fixtures.items():
+        for target, fn in targets_for(name).items():
+            if only and target not in only:
+                continue
+            fn(seq[:WARMUP_FRAMES])
+            timings = np.concatenate([fn(seq) for _ in range(repeat)])
+            results.setdefault(target, {})[name] = summarize(timings)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for target, per_fixture in current["results"].items():
+        for name, stats in per_fixture.items():
+            old = baseline.get("results", {}).get(target, {}).get(name)
+            if not old or not old.get("p50_us"):
+                continue
+            ratio = stats["p50_us"] / old["p50_us"]
+            line = f"{target:<30} {name:<16} p50 {old['p50_us']:>9.2f} -> {stats['p50_us']:>9.2f} us ({ratio:.2f}x)"
+            print(line, file=sys.stderr)
+            if ratio > 1.0 + tolerance:
+                regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame analysis hot path.")
+    parser.add_argument("--frames", type=int, default=3000, help="frames per synthetic fixture")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--target", action="append", default=None, help="only run these targets")
+    parser.add_argument("--no-recorded", action="store_true", help="skip benchmarks/fixtures/*.npy")
+    parser.add_argument("--out", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to compare p50 against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+    # set start/end events would otherwise interleave with the report
+    logging.getLogger("posepal").setLevel(logging.WARNING)
+
+    fixtures = {name: (make() if name == "workout" else make(args.frames))
+                for name, make in SYNTHETIC.items()}
+    if not args.no_recorded:
+        fixtures.update({f"recorded/{name}": seq for name, seq in load_recorded().items()})
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "fixtures": {name: int(len(seq)) for name, seq in fixtures.items()},
+        },
+        "results": run(fixtures, args.repeat, args.target),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
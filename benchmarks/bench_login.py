@@ -0,0 +1,99 @@
+import json
+import time
+import asyncio
+import argparse
+
+import numpy as np
+
+from app.api.utils import auth
+from app.api.utils.auth import pwd_context, verify_password, verify_password_async, PasswordHashBusy
+
+PASSWORD = "correct horse battery staple"
+
+
+async def _inline_login(hashed):
+    # the /auth/login path before hashing moved off the event loop
+    return verify_password(PASSWORD, hashed)
+
+
+async def _executor_login(hashed):
+    return await verify_password_async(PASSWORD, hashed)
+
+
+async def _ticker(stop: asyncio.Event, interval: float, lags: list):
+    # a well-behaved loop wakes this up every `interval` seconds; anything beyond that is lag
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - expected) * 1000.0)
+
+
+async def storm(login, hashed, logins: int, concurrency: int, interval: float) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(_ticker(stop, interval, lags))
+    await asyncio.sleep(interval * 5)
+    gate = asyncio.Semaphore(concurrency)
+    rejected = 0
+    latencies = []
+
+    async def one():
+        nonlocal rejected
+        async with gate:
+            started = time.perf_counter()
+            try:
+                assert await login(hashed)
+            except PasswordHashBusy:
+                rejected += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    lags = np.array(lags or [0.0])
+    latencies = np.array(latencies or [0.0])
+    return {
+        "logins": logins,
+        "rejected": rejected,
+        "logins_per_s": round((logins - rejected) / elapsed, 1),
+        "login_p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "login_p99_ms": round(float(np.percentile(latencies, 99)), 1),
+        "loop_lag_p50_ms": round(float(np.percentile(lags, 50)), 2),
+        "loop_lag_p99_ms": round(float(np.percentile(lags, 99)), 2),
+        "loop_lag_max_ms": round(float(lags.max()), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop lag while a burst of logins verifies passwords.")
+    parser.add_argument("--logins", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=48, help="logins in flight at once")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor of the stored hash")
+    parser.add_argument("--interval", type=float, default=0.005, help="ticker period in seconds")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash(PASSWORD, rounds=args.rounds)
+    report = {
+        "meta": {
+            "rounds": args.rounds,
+            "workers": auth.PASSWORD_HASH_WORKERS,
+            "queue": auth.PASSWORD_HASH_QUEUE,
+            "concurrency": args.concurrency,
+        },
+        "inline": asyncio.run(storm(_inline_login, hashed, args.logins, args.concurrency, args.interval)),
+        "executor": asyncio.run(storm(_executor_login, hashed, args.logins, args.concurrency, args.interval)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
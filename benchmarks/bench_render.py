@@ -0,0 +1,131 @@
+import json
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+import mediapipe as mp
+from mediapipe.framework.formats import landmark_pb2
+
+from app.api.utils.engine import _draw_overlay
+from app.api.utils.landmarks import skeleton_specs, skeleton_color, GREEN, RED
+from app.api.utils.render import FramePool
+from app.api.utils.cues import cue_text
+from app.api.utils.stream import MJPEGEncoder
+
+mp_pose = mp.solutions.pose
+mp_drawing = mp.solutions.drawing_utils
+
+RESULTS = [
+    {"rest": False, "exercise": "squat", "reps": 3, "set_active": True,
+     "good_form": False, "mistakes": ["SQUAT_GO_DEEPER", "SQUAT_CHEST_UP"], "rest_elapsed": None},
+    {"rest": False, "exercise": "squat", "reps": 4, "set_active": True,
+     "good_form": True, "mistakes": [], "rest_elapsed": None},
+    {"rest": True, "exercise": "rest", "reps": 0, "set_active": False,
+     "good_form": True, "mistakes": [], "rest_elapsed": 12.0},
+]
+
+
+def _pose_landmarks(rng):
+    proto = landmark_pb2.NormalizedLandmarkList()
+    for x, y in rng.uniform(0.2, 0.8, size=(33, 2)):
+        proto.landmark.add(x=float(x), y=float(y), z=0.0, visibility=0.9)
+    return proto
+
+
+def _baseline_overlay(image, pose_landmarks, result):
+    # the per-frame render path before the render module existed
+    if result["rest"]:
+        cv2.putText(image, "REST 00:12", (12, 26), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (220, 220, 220), 2)
+        cv2.putText(image, "Raise ONE hand to start SQUAT | Hold PLANK to start PUSH-UP",
+                    (12, 56), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 2)
+        return
+    lm_spec, conn_spec = skeleton_specs(skeleton_color(result["mistakes"]))
+    mp_drawing.draw_landmarks(image, pose_landmarks, mp_pose.POSE_CONNECTIONS,
+                              landmark_drawing_spec=lm_spec, connection_drawing_spec=conn_spec)
+    cv2.putText(image, f"{result['exercise'].upper()} | Reps: {result['reps']}", (12, 26),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (200, 200, 200), 2)
+    if result["set_active"]:
+        cv2.putText(image, "SET ACTIVE", (12, 48), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 220, 255), 2)
+    if result["good_form"]:
+        cv2.putText(image, "Good form!", (12, 70), cv2.FONT_HERSHEY_SIMPLEX, 0.9, GREEN, 2)
+    else:
+        for i, text in enumerate(result["mistakes"][:3]):
+            cv2.putText(image, cue_text(text), (12, 70 + i * 28), cv2.FONT_HERSHEY_SIMPLEX, 0.75, RED, 2)
+
+
+def baseline_frame(frame, pose_landmarks, result):
+    image = frame.copy()
+    _baseline_overlay(image, pose_landmarks, result)
+    ok, buffer = cv2.imencode(".jpg", image)
+    frame_bytes = buffer.tobytes()
+    return (b"--frame\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n")
+
+
+def make_render_frame():
+    pool = FramePool()
+    encoder = MJPEGEncoder()
+
+    def render_frame(frame, pose_landmarks, result):
+        # np.copyto stands in for cap.read() into a pooled buffer
+        image = pool.acquire(frame.shape)
+        np.copyto(image, frame)
+        _draw_overlay(image, pose_landmarks, result)
+        chunk = encoder.encode(image)
+        pool.release(image)
+        return chunk
+
+    return render_frame
+
+
+def measure(fn, frames, pose_landmarks, iterations: int) -> dict:
+    for i in range(10):
+        fn(frames[i % len(frames)], pose_landmarks, RESULTS[i % len(RESULTS)])
+    timings = []
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    allocated = 0
+    for i in range(iterations):
+        snapshot_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        fn(frames[i % len(frames)], pose_landmarks, RESULTS[i % len(RESULTS)])
+        timings.append((time.perf_counter() - started) * 1000.0)
+        allocated += tracemalloc.get_traced_memory()[1] - snapshot_before
+    tracemalloc.stop()
+    timings = np.array(timings)
+    return {
+        "frames": iterations,
+        "p50_ms": round(float(np.percentile(timings, 50)), 3),
+        "p99_ms": round(float(np.percentile(timings, 99)), 3),
+        "peak_alloc_kb_per_frame": round(allocated / iterations / 1024.0, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /video overlay render path.")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    pose_landmarks = _pose_landmarks(rng)
+    report = {
+        "baseline": measure(baseline_frame, frames, pose_landmarks, args.iterations),
+        "render": measure(make_render_frame(), frames, pose_landmarks, args.iterations),
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
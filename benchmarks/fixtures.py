@@ -0,0 +1,153 @@
+import os
+import glob
+import argparse
+
+import numpy as np
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+NUM_LANDMARKS = 33
+
+# image-space (x, y, z) keyframes for the joints the analyzers look at;
+# everything else sits on the nearest joint so normalisation stays sane
+STANDING = {
+    11: (0.45, 0.30, -0.02), 12: (0.55, 0.30, 0.02),
+    13: (0.43, 0.42, -0.02), 14: (0.57, 0.42, 0.02),
+    15: (0.42, 0.52, -0.02), 16: (0.58, 0.52, 0.02),
+    23: (0.46, 0.55, -0.01), 24: (0.54, 0.55, 0.01),
+    25: (0.45, 0.72, -0.01), 26: (0.55, 0.72, 0.01),
+    27: (0.45, 0.90, -0.01), 28: (0.55, 0.90, 0.01),
+}
+SQUAT_BOTTOM = {
+    **STANDING,
+    11: (0.45, 0.44, -0.10), 12: (0.55, 0.44, -0.06),
+    13: (0.43, 0.52, -0.10), 14: (0.57, 0.52, -0.06),
+    15: (0.42, 0.58, -0.12), 16: (0.58, 0.58, -0.08),
+    23: (0.46, 0.77, 0.06), 24: (0.54, 0.77, 0.08),
+    25: (0.46, 0.74, -0.12), 26: (0.54, 0.74, -0.10),
+}
+PLANK = {
+    11: (0.30, 0.55, -0.05), 12: (0.31, 0.56, 0.05),
+    13: (0.30, 0.65, -0.05), 14: (0.31, 0.66, 0.05),
+    15: (0.30, 0.75, -0.05), 16: (0.32, 0.76, 0.05),
+    23: (0.55, 0.56, -0.04), 24: (0.56, 0.57, 0.04),
+    25: (0.66, 0.58, -0.04), 26: (0.67, 0.59, 0.04),
+    27: (0.78, 0.60, -0.04), 28: (0.79, 0.61, 0.04),
+}
+PUSHUP_BOTTOM = {
+    **PLANK,
+    11: (0.30, 0.68, -0.05), 12: (0.31, 0.69, 0.05),
+    13: (0.36, 0.66, -0.07), 14: (0.37, 0.67, 0.07),
+    23: (0.55, 0.64, -0.04), 24: (0.56, 0.65, 0.04),
+}
+ONE_HAND_UP = {**STANDING, 15: (0.40, 0.12, -0.02)}
+BOTH_HANDS_UP = {**STANDING, 15: (0.40, 0.12, -0.02), 16: (0.60, 0.12, 0.02)}
+
+_NEAREST = {0: 11, 1: 11, 2: 11, 3: 11, 4: 12, 5: 12, 6: 12, 7: 11, 8: 12, 9: 11, 10: 12,
+            17: 15, 18: 16, 19: 15, 20: 16, 21: 15, 22: 16,
+            29: 27, 30: 28, 31: 27, 32: 28}
+
+
+def pose_array(keyframe: dict, visibility: float = 0.95) -> np.ndarray:
+    pose = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    for idx, xyz in keyframe.items():
+        pose[idx, :3] = xyz
+    for idx, src in _NEAREST.items():
+        pose[idx, :3] = pose[src, :3]
+    pose[:, 3] = visibility
+    return pose
+
+
+def _cycle(top: dict, bottom: dict, frames: int, period: int) -> np.ndarray:
+    a, b = pose_array(top), pose_array(bottom)
+    depth = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frames) / period)
+    return a + depth[:, None, None] * (b - a)
+
+
+def _hold(keyframe: dict, frames: int) -> np.ndarray:
+    return np.repeat(pose_array(keyframe)[None], frames, axis=0)
+
+
+def _jitter(seq: np.ndarray, rng, sigma: float) -> np.ndarray:
+    seq = seq.copy()
+    seq[..., :3] += rng.normal(scale=sigma, size=seq[..., :3].shape)
+    seq[..., 3] = np.clip(seq[..., 3] + rng.normal(scale=0.03, size=seq.shape[:2]), 0.0, 1.0)
+    return seq.astype(np.float32)
+
+
+def squat_sequence(frames: int = 3000, period: int = 60, seed: int = 0, sigma: float = 0.004):
+    rng = np.random.default_rng(seed)
+    return _jitter(_cycle(STANDING, SQUAT_BOTTOM, frames, period), rng, sigma)
+
+
+def pushup_sequence(frames: int = 3000, period: int = 50, seed: int = 1, sigma: float = 0.004):
+    rng = np.random.default_rng(seed)
+    return _jitter(_cycle(PLANK, PUSHUP_BOTTOM, frames, period), rng, sigma)
+
+
+def rest_sequence(frames: int = 3000, seed: int = 2, sigma: float = 0.004):
+    rng = np.random.default_rng(seed)
+    return _jitter(_hold(STANDING, frames), rng, sigma)
+
+
+def workout_sequence(reps: int = 10, seed: int = 3, sigma: float = 0.004):
+    # rest -> one hand up (squat) -> squats -> both hands up (end set)
+    # -> rest -> plank (push-up) -> push-ups -> both hands up
+    rng = np.random.default_rng(seed)
+    parts = [
+        _hold(STANDING, 60),
+        _hold(ONE_HAND_UP, 20),
+        _cycle(STANDING, SQUAT_BOTTOM, reps * 60, 60),
+        _hold(BOTH_HANDS_UP, 20),
+        _hold(STANDING, 60),
+        _hold(PLANK, 20),
+        _cycle(PLANK, PUSHUP_BOTTOM, reps * 50, 50),
+        _hold(BOTH_HANDS_UP, 20),
+        _hold(STANDING, 60),
+    ]
+    return _jitter(np.concatenate(parts), rng, sigma)
+
+
+SYNTHETIC = {
+    "squat": squat_sequence,
+    "pushup": pushup_sequence,
+    "rest": rest_sequence,
+    "workout": workout_sequence,
+}
+
+
+def load_recorded(directory: str = FIXTURE_DIR) -> dict:
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.npy"))):
+        seq = np.load(path)
+        if seq.ndim != 3 or seq.shape[1:] != (NUM_LANDMARKS, 4):
+            raise ValueError(f"{path}: expected (N, 33, 4) landmarks, got {seq.shape}")
+        # frames where pose detection failed are stored as NaN rows
+        seq = seq[~np.isnan(seq).any(axis=(1, 2))]
+        fixtures[os.path.splitext(os.path.basename(path))[0]] = seq.astype(np.float32)
+    return fixtures
+
+
+def record(path: str, name: str | None = None, directory: str = FIXTURE_DIR, workers: int | None = None):
+    from app.api.utils.offline import extract_landmarks, process_pool
+
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    with process_pool(workers) as executor:
+        landmarks, _ = extract_landmarks(path, executor, workers)
+    os.makedirs(directory, exist_ok=True)
+    out = os.path.join(directory, f"{name}.npy")
+    np.save(out, landmarks)
+    return out, landmarks.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a clip's landmarks as a benchmark fixture.")
+    parser.add_argument("clip")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    out, shape = record(args.clip, args.name, workers=args.workers)
+    print(f"saved {shape} landmarks to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,19 @@
-# scripts/cache_tts.py
+# scripts/cache_voice.py
+# run from the repo root: python -m scripts.cache_voice [--config scripts/voices.json] [--jobs N]
 from pathlib import Path
-import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import hashlib
 import json
+import os
 import sys
 
-VOICE_DIR = Path("/home/Golden5ragon/piper-voices")
-VOICES = {
-    "default": VOICE_DIR / "en_US-libritts-high.onnx",
-    "goggins": VOICE_DIR / "en_US-joe-medium.onnx",
-    "barbie":  VOICE_DIR / "en_US-amy-medium.onnx",
-}
+from app.api.utils.tts import PIPER_POOL
+from app.api.utils.personas import VOICES_CONFIG, load_personas
 
 OUT_ROOT = Path("app/static/tts")
-OUT_ROOT.mkdir(parents=True, exist_ok=True)
+# per persona: clip file -> hash of (voice model, text) it was synthesised from
+STATE_FILE = "clips.json"
 
 BASE_CUES = {
     "GET_ON_FLOOR": "Get on the floor.",
@@ -30,112 +31,145 @@ BASE_CUES = {
     "SQUAT_KNEE_OUT_RIGHT": "Push right knee out.",
 }
 
-PERSONA_CUES = {
-    "goggins": {
-        "GET_ON_FLOOR": "Get on the floor. No excuses.",
-        "HOLD_PLANK": "Lock it in. Straight line.",
-        "HANDS_CLOSER": "Hands closer. Now.",
-        "HANDS_WIDER": "Hands wider. Own it.",
-        "HANDS_UNDER_SHOULDERS": "Hands under shoulders. Tight.",
-        "LIFT_HIPS": "Lift your hips. Stop sagging.",
-        "LOWER_HIPS": "Lower your hips. No piking.",
-        "GO_LOWER": "Lower. Hit depth.",
-        "STEP_BACK": "Step back. Show the legs.",
-        "SQUAT_GO_DEEPER": "Deeper. Full rep.",
-        "SQUAT_CHEST_UP": "Chest up. Control it.",
-        "SQUAT_KNEE_OUT_LEFT": "Left knee out. Now.",
-        "SQUAT_KNEE_OUT_RIGHT": "Right knee out. Now.",
-    },
-    "barbie": {
-        "GET_ON_FLOOR": "Floor time, queen.",
-        "HOLD_PLANK": "Hold that plank, queen.",
-        "HANDS_CLOSER": "Hands closer, queen.",
-        "HANDS_WIDER": "Hands wider, queen.",
-        "HANDS_UNDER_SHOULDERS": "Hands under shoulders, queen.",
-        "LIFT_HIPS": "Lift hips, queen.",
-        "LOWER_HIPS": "Lower hips, queen.",
-        "GO_LOWER": "Lower, queen.",
-        "STEP_BACK": "Step back, queen. Show knees and ankles.",
-        "SQUAT_GO_DEEPER": "Deeper, queen.",
-        "SQUAT_CHEST_UP": "Chest up, queen.",
-        "SQUAT_KNEE_OUT_LEFT": "Left knee out, queen.",
-        "SQUAT_KNEE_OUT_RIGHT": "Right knee out, queen.",
-    },
-    "default": {},
-}
-
 NUM_MAX = 20
 
-def rep_line_for(persona: str, n: int) -> str:
-    if persona == "default":
-        return str(n)
-    if persona == "barbie":
-        return "Six — come on, queen, keep going!" if n == 6 else str(n)
-    if persona == "goggins":
-        if n == 10:
-            return "Ten — a machine here!"
-        if n in (13, 14, 15):
-            return {
-                13: "Thirteen — come on!",
-                14: "Fourteen — come on!",
-                15: "Fifteen — come on!",
-            }[n]
-        if n in (17, 18, 19, 20):
-            return {
-                17: "Get it! Seventeen.",
-                18: "Get it! Eighteen.",
-                19: "Get it! Nineteen.",
-                20: "Get it! Twenty.",
-            }[n]
-        return str(n)
-    return str(n)
-
-def persona_text(persona: str, key: str) -> str:
-    overrides = PERSONA_CUES.get(persona, {})
-    return overrides.get(key, BASE_CUES[key])
-
-def synth_with_piper(model_path: Path, text: str, out_wav: Path):
+def rep_line_for(spec: dict, n: int) -> str:
+    return spec.get("rep_lines", {}).get(str(n), str(n))
+
+def persona_text(spec: dict, key: str) -> str:
+    return spec.get("cues", {}).get(key, BASE_CUES[key])
+
+def clips_for(spec: dict) -> list:
+    # (manifest, key, file name, text)
+    clips = [("tts", key, key.lower() + ".wav", persona_text(spec, key)) for key in BASE_CUES]
+    first, last = spec.get("reps", [1, NUM_MAX])
+    clips += [("rep", f"REP_{n}", f"rep_{n}.wav", rep_line_for(spec, n)) for n in range(first, last + 1)]
+    return clips
+
+def model_digest(model_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def clip_hash(model_digest: str, text: str) -> str:
+    return hashlib.sha256(f"{model_digest}\0{text}".encode("utf-8")).hexdigest()[:24]
+
+def read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+def write_json_atomic(path: Path, data: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    os.replace(tmp, path)
+
+def synth_with_piper(model_path, text: str, out_wav) -> str:
+    out_wav = Path(out_wav)
     out_wav.parent.mkdir(parents=True, exist_ok=True)
-    subprocess.run(
-        ["piper-tts", "--model", str(model_path), "--output_file", str(out_wav)],
-        input=text.encode("utf-8"),
-        check=True
-    )
-
-def generate_cues_for_persona(persona: str, model_path: Path) -> dict:
-    out_dir = OUT_ROOT / persona
-    out_dir.mkdir(parents=True, exist_ok=True)
-    manifest = {}
-    for key in BASE_CUES.keys():
-        text = persona_text(persona, key)
-        out_file = out_dir / (key.lower() + ".wav")
-        synth_with_piper(model_path, text, out_file)
-        manifest[key] = f"/static/tts/{persona}/{out_file.name}"
-    return manifest
-
-def generate_counts_for_persona(persona: str, model_path: Path) -> dict:
-    out_dir = OUT_ROOT / persona
-    out_dir.mkdir(parents=True, exist_ok=True)
-    rep_map = {}
-    for n in range(1, NUM_MAX + 1):
-        text = rep_line_for(persona, n)
-        out_file = out_dir / f"rep_{n}.wav"
-        synth_with_piper(model_path, text, out_file)
-        rep_map[f"REP_{n}"] = f"/static/tts/{persona}/{out_file.name}"
-    return rep_map
+    PIPER_POOL.synthesize(Path(model_path), text, out_wav.resolve())
+    return str(out_wav)
+
+def synth_batch(model_path, items: list) -> list:
+    # the pool task: clips of a single voice, so a process only warms the Piper
+    # workers for the voices it is handed; returns (index, error) for failures
+    failed = []
+    for index, text, out_wav in items:
+        try:
+            synth_with_piper(model_path, text, out_wav)
+        except Exception as e:
+            failed.append((index, e))
+    return failed
+
+def plan(personas: dict, force: bool = False):
+    digests = {}
+    builds, todo = {}, []
+    for persona, spec in personas.items():
+        out_dir = OUT_ROOT / persona
+        model = spec["model"]
+        if model not in digests:
+            digests[model] = model_digest(model)
+        previous = read_json(out_dir / STATE_FILE)
+        build = builds[persona] = {"tts": {}, "rep": {}, "state": {}, "skipped": 0}
+        for manifest, key, name, text in clips_for(spec):
+            digest = clip_hash(digests[model], text)
+            out_file = out_dir / name
+            build[manifest][key] = f"/static/tts/{persona}/{name}"
+            build["state"][name] = digest
+            if force or previous.get(name) != digest or not out_file.exists():
+                todo.append((persona, model, text, out_file))
+            else:
+                build["skipped"] += 1
+    return builds, todo
+
+def run(todo: list, jobs: int) -> list:
+    failed = []
+    if jobs <= 1 or not todo:
+        for persona, model, text, out_file in todo:
+            try:
+                synth_with_piper(model, text, out_file)
+            except Exception as e:
+                failed.append((persona, out_file, e))
+        return failed
+    # group by voice, split each voice over just enough batches to keep `jobs` processes busy
+    by_model = {}
+    for index, (persona, model, text, out_file) in enumerate(todo):
+        by_model.setdefault(str(model), []).append((index, text, str(out_file)))
+    splits = max(1, jobs // len(by_model))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(synth_batch, model, items[i::splits]): items[i::splits]
+                   for model, items in by_model.items() for i in range(splits) if items[i::splits]}
+        for future in as_completed(futures):
+            try:
+                errors = future.result()
+            except Exception as e:
+                errors = [(index, e) for index, *_ in futures[future]]
+            for index, error in errors:
+                persona, _, _, out_file = todo[index]
+                failed.append((persona, out_file, error))
+    return failed
 
 def main():
-    for persona, model in VOICES.items():
-        if not model.exists():
-            print(f"missing model for '{persona}': {model}", file=sys.stderr)
+    parser = argparse.ArgumentParser(description="Precompute persona cue and rep-count audio.")
+    parser.add_argument("--config", type=Path, default=VOICES_CONFIG)
+    parser.add_argument("--persona", action="append", help="only build these personas (repeatable)")
+    parser.add_argument("--jobs", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--force", action="store_true", help="resynthesise clips that are up to date")
+    args = parser.parse_args()
+
+    personas = load_personas(args.config)
+    if args.persona:
+        unknown = set(args.persona) - set(personas)
+        if unknown:
+            parser.error(f"unknown persona(s): {', '.join(sorted(unknown))}")
+        personas = {p: personas[p] for p in args.persona}
+    for persona, spec in personas.items():
+        if not spec["model"].exists():
+            print(f"missing model for '{persona}': {spec['model']}", file=sys.stderr)
             sys.exit(1)
-    for persona, model in VOICES.items():
-        cue_manifest = generate_cues_for_persona(persona, model)
-        rep_manifest = generate_counts_for_persona(persona, model)
+
+    builds, todo = plan(personas, force=args.force)
+    for persona, build in builds.items():
+        pending = sum(1 for p, *_ in todo if p == persona)
+        print(f"{persona}: {pending} to synthesise, {build['skipped']} up to date")
+    failed = run(todo, args.jobs)
+    PIPER_POOL.close()
+
+    for persona, out_file, error in failed:
+        print(f"failed {persona}/{out_file.name}: {error}", file=sys.stderr)
+        # forget the hash so the clip is retried on the next run
+        builds[persona]["state"].pop(out_file.name, None)
+    for persona, build in builds.items():
         out_dir = OUT_ROOT / persona
-        (out_dir / "tts_manifest.json").write_text(json.dumps(cue_manifest, indent=2))
-        (out_dir / "rep_manifest.json").write_text(json.dumps(rep_manifest, indent=2))
-    print("\nDone")
+        out_dir.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(out_dir / "tts_manifest.json", build["tts"])
+        write_json_atomic(out_dir / "rep_manifest.json", build["rep"])
+        write_json_atomic(out_dir / STATE_FILE, build["state"])
+    print(f"\nDone: {len(todo) - len(failed)} synthesised, {len(failed)} failed")
+    sys.exit(1 if failed else 0)
 
 if __name__ == "__main__":
     main()
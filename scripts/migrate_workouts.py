@@ -0,0 +1,64 @@
+# Moves workouts embedded in user documents into the workouts collection.
+# run from the repo root: python -m scripts.migrate_workouts [--dry-run] [--keep]
+# Safe to re-run: each embedded workout gets a deterministic _id, so documents
+# copied by an interrupted run are skipped as duplicates.
+import argparse
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from app.api.utils.db import users_collection, workouts_collection, ensure_indexes
+
+DUPLICATE_KEY = 11000
+
+
+def _documents(user: dict) -> list[dict]:
+    username = user["username"]
+    docs = []
+    for i, workout in enumerate(user.get("workouts") or []):
+        docs.append({
+            **workout,
+            "_id": f"{username}:{i}:{workout.get('created_at', '')}",
+            "username": username,
+        })
+    return docs
+
+
+async def _insert(docs: list[dict]) -> int:
+    try:
+        result = await workouts_collection.insert_many(docs, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def migrate(dry_run: bool = False, keep: bool = False) -> dict:
+    await ensure_indexes()
+    stats = {"users": 0, "workouts": 0, "inserted": 0}
+    cursor = users_collection.find({"workouts.0": {"$exists": True}}, {"username": 1, "workouts": 1})
+    async for user in cursor:
+        docs = _documents(user)
+        stats["users"] += 1
+        stats["workouts"] += len(docs)
+        if dry_run:
+            continue
+        stats["inserted"] += await _insert(docs)
+        if not keep:
+            await users_collection.update_one({"_id": user["_id"]}, {"$unset": {"workouts": ""}})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded workout arrays into their own collection.")
+    parser.add_argument("--dry-run", action="store_true", help="count what would be moved")
+    parser.add_argument("--keep", action="store_true", help="leave the embedded arrays in place")
+    args = parser.parse_args()
+    stats = asyncio.run(migrate(dry_run=args.dry_run, keep=args.keep))
+    print(f"{stats['users']} users, {stats['workouts']} workouts, {stats['inserted']} inserted")
+
+
+if __name__ == "__main__":
+    main()
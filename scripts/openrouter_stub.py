@@ -0,0 +1,69 @@
+# Minimal OpenAI-compatible chat completions server for load tests:
+#   uvicorn scripts.openrouter_stub:app --port 8099
+#   OPENROUTER_BASE_URL=http://localhost:8099/v1 uvicorn app.api.main:app
+import os
+import json
+import time
+import random
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_SECONDS = float(os.getenv("STUB_LATENCY_SECONDS", 1.5))
+TOKEN_SECONDS = float(os.getenv("STUB_TOKEN_SECONDS", 0.05))
+
+LINES = [
+    "Solid work, keep that pace.",
+    "Strong set, stay locked in.",
+    "Nice effort, you are getting sharper.",
+]
+
+app = FastAPI()
+calls = {"count": 0}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    calls["count"] += 1
+    await asyncio.sleep(LATENCY_SECONDS)
+    prompt = body["messages"][-1]["content"]
+    # only the label's own line; the prompt carries instructions after it
+    issues = (prompt.rsplit("Frequent issues:", 1)[-1].strip().splitlines() or ["none"])[0].strip()
+    cue = "Keep it clean." if issues == "none" else f"Focus on: {issues.split(',')[0]}"
+    content = f"{random.choice(LINES)} {cue} Add two reps next set."
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, content), media_type="text/event-stream")
+    return {
+        "id": f"stub-{calls['count']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+async def _stream(body: dict, content: str):
+    # one word per chunk, OpenAI server-sent-events framing
+    for i, word in enumerate(content.split(" ")):
+        chunk = {
+            "id": f"stub-{calls['count']}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(TOKEN_SECONDS)
+    yield "data: [DONE]\n\n"
+
+
+@app.get("/v1/stats")
+def stats():
+    return calls
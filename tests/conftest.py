@@ -0,0 +1,7 @@
+import os
+
+# app modules read these at import time; tests never reach a real server
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("STUB_LATENCY_SECONDS", "0")
+os.environ.setdefault("STUB_TOKEN_SECONDS", "0")
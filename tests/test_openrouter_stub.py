@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+from app.api.routes.ai_feedback import _build_prompt, _bucketed, _messages
+from scripts.openrouter_stub import app
+
+client = TestClient(app)
+
+
+def _reply(payload: dict) -> str:
+    # the prompt as the app builds it, so a format change shows up here
+    messages = _messages(_build_prompt(_bucketed(payload)), "default")
+    r = client.post("/v1/chat/completions", json={"model": "stub", "messages": messages})
+    assert r.status_code == 200
+    return r.json()["choices"][0]["message"]["content"]
+
+
+def test_no_issues():
+    text = _reply({"exercise": "squat", "reps": 12, "duration": 75, "mistakes": []})
+    assert "Keep it clean." in text
+    assert "Focus on" not in text
+
+
+def test_first_issue_only():
+    text = _reply({"exercise": "squat", "reps": 12, "duration": 75,
+                   "mistakes": ["knees caving", "knees caving", "heels lifting"]})
+    assert "Focus on: knees caving " in text
+    assert "\n" not in text
+    assert "ranges" not in text
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.api.utils.engine import process_landmarks, set_config_handler
+from app.api.utils.recorder import SessionRecorder
+from app.api.utils.replay import replay, ReplayClock
+from app.api.utils.session import PoseSession
+
+
+def _record(directory, switch_at: int, frames: int = 8, chunk_frames: int = 4) -> PoseSession:
+    clock = ReplayClock()
+    session = PoseSession("live")
+    session.clock = clock
+    session.feedback_enabled = False
+    session.recorder = SessionRecorder(str(directory), "live", chunk_frames=chunk_frames)
+    # still, fully hidden landmarks: no reps and no gestures, only the explicit switch moves the exercise
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    for frame in range(frames):
+        clock.now = frame / 30
+        if frame == switch_at:
+            set_config_handler(session, "pushup")
+        process_landmarks(session, landmarks)
+    session.recorder.close()
+    return session
+
+
+def test_switch_at_chunk_boundary(tmp_path):
+    live = _record(tmp_path, switch_at=4)
+    assert live.exercise == "pushup"
+    session = PoseSession("replay")
+    replay(str(tmp_path), session=session)
+    assert session.exercise == "pushup"
+
+
+def test_switch_inside_chunk(tmp_path):
+    _record(tmp_path, switch_at=5)
+    session = PoseSession("replay")
+    replay(str(tmp_path), session=session)
+    assert session.exercise == "pushup"
@@ -0,0 +1,29 @@
+import time
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from app.api.utils import workout_store
+
+
+def test_rest_is_not_a_set(monkeypatch):
+    collection = AsyncMongoMockClient()["test"]["workouts"]
+    monkeypatch.setattr(workout_store, "workouts_collection", collection)
+    now = time.time()
+
+    async def run():
+        await collection.insert_many([
+            {"username": "ana", "exercise": "squat", "reps": 10, "duration": 30.0, "created_at": now,
+             "mistakes": [{"cue": "knees caving", "count": 2}]},
+            {"username": "ana", "exercise": "rest", "reps": 0, "duration": 90.0, "created_at": now + 40},
+            {"username": "ana", "exercise": "pushup", "reps": 8, "duration": 20.0, "created_at": now + 140},
+            {"username": "bo", "exercise": "squat", "reps": 50, "duration": 60.0, "created_at": now},
+        ])
+        return await workout_store.workout_stats("ana")
+
+    stats = asyncio.run(run())
+    assert set(stats["exercises"]) == {"squat", "pushup"}
+    assert sum(w["sets"] for w in stats["weeks"]) == 2
+    assert sum(w["reps"] for w in stats["weeks"]) == 18
+    assert stats["avg_set_duration"] == 25.0
+    assert stats["top_mistakes"] == [{"cue": "knees caving", "count": 2}]